@@ -1,9 +1,14 @@
 import cv2
 import streamlit as st
 import numpy as np
-from fer import FER
-import pandas as pd
 import random
+from emotion import top_emotion
+from startup import Preloader, load_emotion_model, load_movies
+@st.cache_resource
+def get_preloader():
+    """Start loading the emotion model and the catalog once per server process, not per rerun."""
+    return Preloader([('movies', load_movies), ('emotion model', load_emotion_model)]).start()
+preloader=get_preloader()
 genre_choices=['Animation', 'Adventure', 'Comedy', 'Action', 'Family', 'Romance',
        'Drama', 'Crime', 'Thriller', 'Fantasy', 'Horror', 'Biography',
        'History', 'Mystery', 'Sci-Fi', 'War', 'Sport', 'Music',
@@ -23,7 +28,8 @@ if page == "Set Up Preferances":
         st.text("Please wait until completed is shown")
         submit=st.form_submit_button()
     if submit:
-        emo_detector=FER(mtcnn=True)
+        with st.spinner("Loading the emotion model..."):
+            emo_detector=preloader.get('emotion model')
         cap=cv2.VideoCapture(0)
         if cap.isOpened():
             result,image=cap.read()
@@ -32,8 +38,9 @@ if page == "Set Up Preferances":
         while result:
             result,image=cap.read()
             cv2.imshow("testing",image)
-            if len(emo_detector.detect_emotions(image))>0:
-                emotion_name,score=emo_detector.top_emotion(image)
+            faces=emo_detector.detect(image)
+            if len(faces)>0:
+                emotion_name=top_emotion(faces)  # From the same detection, not a second inference
                 break
             if(cv2.waitKey(10)==27):
                 break
@@ -62,7 +69,7 @@ elif page == 'Recommendations':
         st.header("PLS SETUP RECOMMENDATIONS")
     else:
         st.header("Recommendations")
-        movies=pd.read_csv("cleanest_movie.csv")
+        movies=preloader.get('movies')  # Loaded in the background since the first page view
         def filter_movs(dataframe,gen_list):
             i=0
             for gen in gen_list:
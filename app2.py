@@ -1,17 +1,31 @@
 import cv2
 import streamlit as st
-import pandas as pd
 import random
-import requests
-from fer import FER
+import uuid
+from posters import fetch_posters, DEFAULT_POSTER
+from dead_posters import get_dead_posters
+from catalog import sample_movies
+from thumbnails import THUMB_SIZES
+from prefetch import get_prefetcher, PAGE_SIZE
+from recommendation_cache import get_recommendation_cache
+from history import DEFAULT_USER, get_history
+from emotion import top_emotion
+from metrics import timed, flush
+import profiling
+from startup import Preloader, load_emotion_model, load_movies
+from inference import InferenceScheduler
+
+# Opt-in profiling, each script run is profiled on its own thread and the report rewritten at its end
+if profiling.requested():
+    profiling.start()
 
 # Default genres for each emotion
 default_emo_genres_map = {
-    'anger': ['Action', 'Thriller', 'Crime'],
+    'angry': ['Action', 'Thriller', 'Crime'],
     'disgust': ['Horror', 'Drama', 'Crime'],
     'fear': ['Thriller', 'Horror', 'Mystery'],
-    'happiness': ['Comedy', 'Romance', 'Animation'],
-    'sadness': ['Drama', 'Romance', 'Biography'],
+    'happy': ['Comedy', 'Romance', 'Animation'],
+    'sad': ['Drama', 'Romance', 'Biography'],
     'surprise': ['Sci-Fi', 'Adventure', 'Fantasy'],
     'neutral': ['Documentary', 'Drama', 'Biography']
 }
@@ -34,41 +48,94 @@ emotion_emoji_map = {
     'neutral': '😐'
 }
 
+@st.cache_resource
+def get_preloader():
+    """Start loading the emotion model and the catalog once per server process, not per rerun."""
+    return Preloader([('movies', load_movies), ('emotion model', load_emotion_model)]).start()
+
+preloader = get_preloader()
+
+@st.cache_resource
+def get_inference():
+    """The process's inference workers, every session's frames go through their fair queue."""
+    return InferenceScheduler(lambda: preloader.get('emotion model'))
+
+inference = get_inference()
+
 # Sidebar for page selection
 page = st.sidebar.radio("Select Page", ["Set Up Preferences", "Recommendations"])
-
-# Function to validate image URL
-def is_valid_image(url):
-    """Check if the image URL is valid and accessible."""
+queue = inference.stats()
+st.sidebar.caption(f"Emotion model queue: {queue['pending']} frames waiting, "
+                   f"{queue['mean_wait_s'] * 1000:.0f} ms mean wait")
+# Identifies this browser session to the process-wide poster prefetcher and inference queue
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+# Whose history is read and written, the same across reloads and restarts: ?user= in the URL, else EMOREC_USER
+history_user = st.query_params.get("user") or DEFAULT_USER
+MAX_PAGES = 10  # Recommendation pages picked per detected emotion
+
+# Optimized movie filtering function (shows movies containing ANY of the selected genres)
+def match_genres(dataframe, gen_list):
+    pattern = '|'.join(gen_list)  # Create regex OR pattern
+    return dataframe['Genre'].str.contains(pattern, case=False, na=False)
+
+def filter_movs(dataframe, gen_list):
+    """Filters movies that contain at least one of the selected genres, shared across sessions."""
+    return get_recommendation_cache().filter(dataframe, gen_list, match_genres)
+
+def load_recommendations(emo_genres):
+    """Load the movie dataset and pick shuffled recommendations for the selected genres."""
     try:
-        response = requests.get(url, stream=True, timeout=5)
-        return response.status_code == 200
-    except requests.RequestException:
-        return False
+        movies = preloader.get('movies')  # Loaded in the background since the first page view
+    except ValueError:
+        st.error("CSV file does not contain required columns.")  # load_catalog reads only the columns the app uses
+        st.stop()
+    except FileNotFoundError:
+        st.error("Movie dataset not found. Please ensure 'cleanest_movie.csv' is available.")
+        st.stop()
+
+    # Validate dataset columns
+    if 'Genre' not in movies.columns or 'Title' not in movies.columns or 'Poster' not in movies.columns:
+        st.error("CSV file does not contain required columns.")
+        st.stop()
+
+    # Filter, shuffle and limit recommendations, skipping posters known to be dead
+    with timed('filter'):
+        recomm_movs = filter_movs(movies, emo_genres)
+    recent = get_history().recent_titles(user=history_user)  # Shown to this user lately
+    with timed('sample'):
+        return sample_movies(recomm_movs, MAX_PAGES * PAGE_SIZE, dead_posters=get_dead_posters(),
+                             skip_titles=recent).reset_index(drop=True)
 
 if page == "Set Up Preferences":
+    saved = get_history().load_preferences(user=history_user)  # Picks from earlier sessions, kept across restarts
     with st.form(key="user-form"):
-        anger_genres = st.multiselect("Anger", genre_choices)
-        disgust_genres = st.multiselect("Disgust", genre_choices)
-        fear_genres = st.multiselect("Fear", genre_choices)
-        happiness_genres = st.multiselect("Happiness", genre_choices)
-        sad_genres = st.multiselect("Sadness", genre_choices)
-        surprise_genres = st.multiselect("Surprise", genre_choices)
-        neutral_genres = st.multiselect("Neutral", genre_choices)
+        anger_genres = st.multiselect("Anger", genre_choices, default=saved.get('angry', []))
+        disgust_genres = st.multiselect("Disgust", genre_choices, default=saved.get('disgust', []))
+        fear_genres = st.multiselect("Fear", genre_choices, default=saved.get('fear', []))
+        happiness_genres = st.multiselect("Happiness", genre_choices, default=saved.get('happy', []))
+        sad_genres = st.multiselect("Sadness", genre_choices, default=saved.get('sad', []))
+        surprise_genres = st.multiselect("Surprise", genre_choices, default=saved.get('surprise', []))
+        neutral_genres = st.multiselect("Neutral", genre_choices, default=saved.get('neutral', []))
         st.text("Please wait until completed is shown")
         submit = st.form_submit_button()
     if submit:
-        emo_detector = FER(mtcnn=True)
-        cap = cv2.VideoCapture(0)
+        with st.spinner("Loading the emotion model..."):
+            preloader.get('emotion model')  # Raises here when it could not be loaded
+        with timed('camera_open'):
+            cap = cv2.VideoCapture(0)
         if not cap.isOpened():
             st.error("Unable to access webcam. Please ensure the camera is connected.")
             st.stop()
         result, image = cap.read()
         emotion_name = 'neutral'  # Default emotion
+        scores = None
         while result:
             result, image = cap.read()
-            if len(emo_detector.detect_emotions(image)) > 0:
-                emotion_name, score = emo_detector.top_emotion(image)
+            faces = inference.detect(st.session_state.session_id, image)  # Queued with the other sessions' frames
+            if faces:
+                emotion_name = top_emotion(faces)  # From the same detection, not a second inference
+                scores = faces[0]['emotions']
                 break
             if cv2.waitKey(1) == 27:  # Exit on ESC key
                 break
@@ -81,15 +148,17 @@ if page == "Set Up Preferences":
         st.write(f"You Are Feeling **{emotion_name.capitalize()}** {emotion_emoji}, we'll show you movies for that.")
 
         # Set emotion genres based on the detected emotion
-        emo_genres_map = {
-            'anger': anger_genres,
+        emo_genres_map = {  # Keyed by the labels the emotion model detects
+            'angry': anger_genres,
             'disgust': disgust_genres,
             'fear': fear_genres,
-            'happiness': happiness_genres,
-            'sadness': sad_genres,
+            'happy': happiness_genres,
+            'sad': sad_genres,
             'surprise': surprise_genres,
             'neutral': neutral_genres
         }
+        get_history().save_preferences(emo_genres_map, user=history_user)
+        get_history().record_detection(emotion_name, scores, user=history_user)
         emo_genres = emo_genres_map.get(emotion_name, [])
 
         # If no genres are selected, revert to default genres
@@ -100,6 +169,14 @@ if page == "Set Up Preferences":
         st.session_state.emo_genres = emo_genres
         st.session_state.emotion_detected = True
 
+        # Pick the recommendations now and start warming their posters while the user reads this
+        st.session_state.recommendations = load_recommendations(emo_genres)
+        st.session_state.rec_page = 0
+        st.session_state.shown_pages = set()  # Pages whose movies are recorded as shown
+        st.session_state.emotion_name = emotion_name
+        get_prefetcher().prefetch_pages(st.session_state.recommendations['Poster'].tolist(), 0,
+                                        size=THUMB_SIZES['web'], owner=st.session_state.session_id)
+
         st.success("Emotion Detected, You can now view recommendations.")
 
 elif page == 'Recommendations':
@@ -107,49 +184,50 @@ elif page == 'Recommendations':
         st.warning("Please detect your emotion first in the 'Set Up Preferences' page.")
     else:
         st.header("Recommendations")
-        try:
-            movies = pd.read_csv("cleanest_movie.csv")  # Load the movie dataset
-        except FileNotFoundError:
-            st.error("Movie dataset not found. Please ensure 'cleanest_movie.csv' is available.")
-            st.stop()
-
-        # Validate dataset columns
-        if 'Genre' not in movies.columns or 'Title' not in movies.columns or 'Poster' not in movies.columns:
-            st.error("CSV file does not contain required columns.")
-            st.stop()
-
-        # Optimized movie filtering function (shows movies containing ANY of the selected genres)
-        def filter_movs(dataframe, gen_list):
-            """Filters movies that contain at least one of the selected genres."""
-            pattern = '|'.join(gen_list)  # Create regex OR pattern
-            return dataframe[dataframe['Genre'].str.contains(pattern, case=False, na=False)]
-
-        # Filter recommendations based on selected genres
-        recomm_movs = filter_movs(movies, st.session_state.emo_genres)
+        recomm_movs = st.session_state.recommendations
 
         # Check if any movies match the selected genres
         if recomm_movs.empty:
             st.warning("No movies found for the selected genres.")
         else:
-            recomm_movs = recomm_movs.sample(frac=1).reset_index(drop=True)  # Shuffle results
-            recomm_movs = recomm_movs.head(16)  # Limit recommendations to 16 movies
+            page_start = st.session_state.rec_page * PAGE_SIZE
+            page_movs = recomm_movs.iloc[page_start:page_start + PAGE_SIZE]
             num_cols = 4  # Number of columns per row
-            num_movies = len(recomm_movs)  # Total recommended movies
+            num_movies = len(page_movs)  # Recommended movies on this page
+            poster_urls = page_movs['Poster'].tolist()
+            prefetcher = get_prefetcher()
+            if st.session_state.rec_page not in st.session_state.shown_pages:  # Once per page, not per rerun
+                st.session_state.shown_pages.add(st.session_state.rec_page)
+                get_history().record_impressions(page_movs['Title'].tolist(), emotion=st.session_state.emotion_name,
+                                                 user=history_user)
+                prefetcher.record_use(poster_urls, size=THUMB_SIZES['web'])
+            # Fetch all posters concurrently (through the shared disk cache) before drawing the grid,
+            # as thumbnails pre-scaled to the column width so the browser gets small files
+            with timed('poster_fetch'):
+                poster_paths = fetch_posters(poster_urls, size=THUMB_SIZES['web'])
 
             # Display movies in a dynamic grid
-            for i in range(0, num_movies, num_cols):
-                cols = st.columns(num_cols)  # Create a new row with 4 columns
-                for j in range(num_cols):
-                    if i + j < num_movies:  # Ensure we don't go out of bounds
-                        with cols[j]:
-                            movie = recomm_movs.iloc[i + j]
-                            st.write(f"**{movie['Title']}**")
-                            # Validate poster URL
-                            poster_url = movie['Poster']
-                            default_poster = "default_poster.jpg"  # Path to default image
-                            if not poster_url or not is_valid_image(poster_url):
-                                poster_url = default_poster
-                            st.image(poster_url, use_container_width=True)
-
-            # Clean up session state after showing recommendations
-            del st.session_state.emo_genres
+            with timed('render'):
+                for i in range(0, num_movies, num_cols):
+                    cols = st.columns(num_cols)  # Create a new row with 4 columns
+                    for j in range(num_cols):
+                        if i + j < num_movies:  # Ensure we don't go out of bounds
+                            with cols[j]:
+                                movie = page_movs.iloc[i + j]
+                                st.write(f"**{movie['Title']}**")
+                                poster_path = poster_paths.get(movie['Poster']) or DEFAULT_POSTER
+                                st.image(poster_path, use_container_width=True)
+
+            # Next page of the same recommendations, its posters are already being prefetched
+            if page_start + PAGE_SIZE < len(recomm_movs) and st.button("More recommendations"):
+                st.session_state.rec_page += 1
+                # The new page is fetched by the rerun itself, warm the ones after it
+                prefetcher.prefetch_pages(recomm_movs['Poster'].tolist(), st.session_state.rec_page + 1,
+                                          size=THUMB_SIZES['web'], owner=st.session_state.session_id)
+                st.rerun()
+            st.sidebar.caption(f"Poster prefetch hit rate: {prefetcher.stats()['hit_rate']:.0%}")
+            st.sidebar.caption(f"Recommendation cache hit rate: {get_recommendation_cache().stats()['hit_rate']:.0%}")
+
+# Streamlit reruns this script for every interaction and never exits, so write the reports each run
+flush()
+profiling.write_report()
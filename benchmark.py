@@ -0,0 +1,418 @@
+"""Benchmark the main stages of the app and write the timings as JSON.
+
+    python benchmark.py --rows 10000,100000,1000000 --output bench.json
+    python benchmark.py --rows 10000000 --stages catalog --baseline bench.json
+
+Stages:
+  inference  model load, face detection, batched classification (needs fer)
+  preprocess face crop/resize/normalize per frame, FER's allocating steps vs the reused
+             FaceBuffers, with the peak memory each allocates on the way
+  catalog    CSV vs load_catalog() load, genre filtering (str.contains, apply, GenreIndex,
+             a RecommendationCache hit) and sampling, on synthetic catalogs of every --rows size
+  stream     StreamingCatalog.recommend() over a --stream-rows CSV several times larger
+             than --stream-memory-mb, with the peak Python allocation checked against it
+  posters    fetch_posters() against a local stub server, cold and warm cache
+  startup    import time and time to first paint of every frontend, each in a fresh
+             process (Qt offscreen, Kivy and Streamlit's AppTest where installed)
+
+With --baseline, medians are compared with an earlier run and the exit status is 1
+when any benchmark got slower than --threshold times its baseline. It is 1 as well
+when the stream stage went over its memory budget.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import random
+import argparse
+import subprocess
+import platform
+import statistics
+import tempfile
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+import pandas as pd
+from recommendation_cache import RecommendationCache
+from emotion import FaceBuffers, PADDING, TARGET_SIZE, preprocess_faces, tosquare
+from catalog import (GenreIndex, StreamingCatalog, load_catalog, recommend, sample_movies,
+                     CATALOG_CACHE_SUFFIX, EMOTION_GENRES, STREAM_CHUNK_ROWS)
+
+GENRES = ['Animation', 'Adventure', 'Comedy', 'Action', 'Family', 'Romance',
+          'Drama', 'Crime', 'Thriller', 'Fantasy', 'Horror', 'Biography',
+          'History', 'Mystery', 'Sci-Fi', 'War', 'Sport', 'Music',
+          'Documentary', 'Musical', 'Western', 'Short', 'Film-Noir',
+          'Talk-Show', 'News', 'Adult', 'Reality-TV', 'Game-Show']
+GENRE_COMBOS = 800  # Distinct Genre values in a synthetic catalog, the real one has about as many
+FRAME_SIZE = (640, 480)  # Webcam frames
+SAMPLE_SIZE = 160  # Movies the apps sample per emotion (MAX_PAGES * PAGE_SIZE)
+POSTER_COUNT = 64
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTENDS = [  # (name, script, toolkit)
+    ('movie', 'movie.py', 'qt'),
+    ('movie2', 'movie2.py', 'qt'),
+    ('movie3', 'movie3.py', 'qt'),
+    ('phone', os.path.join('phone', 'movie1.py'), 'kivy'),
+    ('app', 'app.py', 'streamlit'),
+    ('app1', 'app1.py', 'streamlit'),
+    ('app2', 'app2.py', 'streamlit'),
+]
+STARTUP_TIMEOUT = 120  # Seconds a frontend gets to show its first frame
+
+
+def measure(func, repeat=5):
+    """Run func repeat times, return the timing summary in seconds."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return summarize(runs)
+
+
+def summarize(runs):
+    return {'min_s': min(runs), 'median_s': statistics.median(runs), 'mean_s': statistics.fmean(runs), 'runs': len(runs)}
+
+
+def synthetic_catalog(rows, poster_base="http://127.0.0.1:1/posters/", seed=0, start=0):
+    """Catalog shaped like cleanest_movie.csv: Genre holds a list literal such as "['Action', 'Drama']"."""
+    rng = np.random.default_rng(seed)
+    combos = [str([str(genre) for genre in rng.choice(GENRES, size=rng.integers(1, 4), replace=False)])
+              for _ in range(GENRE_COMBOS)]
+    ids = pd.Series(np.arange(start, start + rows)).astype(str)
+    return pd.DataFrame({
+        'Title': "Synthetic Movie " + ids,
+        'Genre': np.asarray(combos, dtype=object)[rng.integers(0, GENRE_COMBOS, rows)],
+        'Poster': poster_base + ids + ".jpg",
+    })
+
+
+def synthetic_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8) for _ in range(count)]
+
+
+def load_frames(frames_dir, count):
+    """Fixture images when a directory is given (use real faces), synthetic frames otherwise."""
+    if frames_dir:
+        paths = sorted(glob.glob(os.path.join(frames_dir, "*.jpg")) + glob.glob(os.path.join(frames_dir, "*.png")))
+        frames = [frame for frame in (cv2.imread(path) for path in paths[:count]) if frame is not None]
+        if frames:
+            return frames, 'fixture'
+    return synthetic_frames(count), 'synthetic'
+
+
+def bench_inference(record, repeat, frames_dir):
+    from emotion import EmotionModel
+    started = time.perf_counter()
+    try:
+        model = EmotionModel()  # fer is only imported here
+    except ImportError as e:
+        record('inference', 'skipped', {'reason': str(e)}, None)
+        return
+    record('inference', 'model_load', {}, {'min_s': time.perf_counter() - started, 'runs': 1})
+    frames, source = load_frames(frames_dir, 8)
+    params = {'frames': len(frames), 'source': source}
+    record('inference', 'face_detection', params,
+           measure(lambda: [model.detector.find_faces(frame, bgr=True) for frame in frames], repeat))
+    for batch_size in (1, 8, 32):
+        crops = np.random.default_rng(0).uniform(-1, 1, (batch_size,) + model.target_size).astype("float32")
+        record('inference', 'classification', {'batch': batch_size},
+               measure(lambda: model.detector._classify_emotions(crops), repeat))
+    record('inference', 'predict', params, measure(lambda: model.predict(frames), repeat))
+
+
+def fer_preprocess(frame, boxes):
+    """FER.detect_emotions()' preprocessing, a new array at every step, the baseline for FaceBuffers."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    mean = cv2.mean(gray[-2:])[0]
+    gray = cv2.copyMakeBorder(gray, PADDING, PADDING, PADDING, PADDING, cv2.BORDER_CONSTANT, value=[mean, mean, mean])
+    crops = []
+    for box in boxes:
+        x, y, w, h = tosquare(box)
+        face = gray[max(0, y - 10 + PADDING):y + h + 10 + PADDING, max(0, x - 10 + PADDING):x + w + 10 + PADDING]
+        face = cv2.resize(face, TARGET_SIZE).astype("float32")
+        crops.append((face / 255.0 - 0.5) * 2.0)
+    return np.expand_dims(np.array(crops), -1)
+
+
+def bench_preprocess(record, repeat, frames_dir):
+    """Per-frame latency and transient allocation of face preprocessing, allocating vs FaceBuffers."""
+    frames, source = load_frames(frames_dir, 8)
+    buffers = FaceBuffers()
+    for faces in (1, 4):
+        boxes = [[40 + 120 * i, 60, 100, 120] for i in range(faces)]
+        params = {'frames': len(frames), 'faces': faces, 'source': source}
+        runs = {
+            'fer_alloc': lambda: [fer_preprocess(frame, boxes) for frame in frames],
+            'buffered': lambda: [preprocess_faces(frame, boxes, buffers) for frame in frames],
+        }
+        for name, run in runs.items():
+            run()  # Sizes the buffers, as the first frame of a session does
+            timing = measure(run, repeat)
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            timing.update({'per_frame_ms': timing['median_s'] * 1000 / len(frames),
+                           'alloc_peak_kb': round((peak - before) / 1024, 1)})
+            record('preprocess', name, params, timing)
+
+
+def bench_catalog(record, repeat, rows, workdir):
+    path = os.path.join(workdir, f"catalog_{rows}.csv")
+    started = time.perf_counter()
+    synthetic_catalog(rows).to_csv(path, index=False)
+    params = {'rows': rows}
+    record('catalog', 'generate', params, {'min_s': time.perf_counter() - started, 'runs': 1})
+
+    record('catalog', 'read_csv', params, measure(lambda: pd.read_csv(path), repeat))
+
+    def cold_load():
+        if os.path.exists(path + CATALOG_CACHE_SUFFIX):
+            os.remove(path + CATALOG_CACHE_SUFFIX)
+        load_catalog(path)
+
+    record('catalog', 'load_catalog_cold', params, measure(cold_load, repeat))
+    load_catalog(path)
+    record('catalog', 'load_catalog_warm', params, measure(lambda: load_catalog(path), repeat))
+
+    # Filters as the apps run them, on the frame they load
+    movies = pd.read_csv(path)
+    genres = EMOTION_GENRES['happy']
+    pattern = '|'.join(genres)
+    record('catalog', 'filter_str_contains', params,
+           measure(lambda: movies[movies['Genre'].str.contains(pattern, case=False, na=False)], repeat))
+    cache = RecommendationCache()
+    match = lambda frame, names: frame['Genre'].str.contains('|'.join(names), case=False, na=False)
+    cache.filter(movies, genres, match)
+    record('catalog', 'filter_cache_hit', params, measure(lambda: cache.filter(movies, genres, match), repeat))
+    record('catalog', 'filter_apply', params,
+           measure(lambda: movies[movies['Genre'].apply(lambda x: any(genre in x for genre in genres))], repeat))
+    optimized = load_catalog(path)
+    record('catalog', 'genre_index_build', params, measure(lambda: GenreIndex(optimized['Genre']), repeat))
+    index = GenreIndex(optimized['Genre'])
+    record('catalog', 'filter_genre_index', params, measure(lambda: index.filter(optimized, genres), repeat))
+
+    matches = index.filter(optimized, genres)
+    record('catalog', 'sample_movies', params, measure(lambda: sample_movies(matches, SAMPLE_SIZE), repeat))
+    distribution = {'happy': 0.7, 'surprise': 0.2, 'neutral': 0.1}
+    record('catalog', 'recommend_scan', params,
+           measure(lambda: recommend(optimized, distribution, n=SAMPLE_SIZE), repeat))
+    record('catalog', 'recommend_index', params,
+           measure(lambda: recommend(optimized, distribution, n=SAMPLE_SIZE, index=index), repeat))
+    for stale in (path, path + CATALOG_CACHE_SUFFIX):
+        os.remove(stale)
+
+
+def bench_stream(record, repeat, rows, workdir, memory_mb):
+    """StreamingCatalog on a CSV several times memory_mb, False when Python's peak allocation went over it."""
+    path = os.path.join(workdir, f"stream_{rows}.csv")
+    started = time.perf_counter()
+    written = 0
+    while written < rows:  # Written a chunk at a time, the catalog never exists in memory
+        chunk = min(STREAM_CHUNK_ROWS, rows - written)
+        synthetic_catalog(chunk, start=written).to_csv(path, mode="a", header=written == 0, index=False)
+        written += chunk
+    file_mb = os.path.getsize(path) / (1024 * 1024)
+    params = {'rows': rows, 'file_mb': round(file_mb), 'memory_mb': memory_mb}
+    record('stream', 'generate', params, {'min_s': time.perf_counter() - started, 'runs': 1})
+
+    chunk_rows = max(1000, int(STREAM_CHUNK_ROWS * memory_mb / 128))  # A default chunk peaks below ~100 MB
+    catalog = StreamingCatalog(path, chunk_rows=chunk_rows)
+    distribution = {'happy': 0.7, 'surprise': 0.2, 'neutral': 0.1}
+    tracemalloc.start()
+    try:
+        timing = measure(lambda: catalog.recommend(distribution, n=SAMPLE_SIZE), repeat)
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+    timing.update({'peak_mb': round(peak_mb, 1), 'within_memory': peak_mb < memory_mb})
+    record('stream', 'recommend', params, timing)
+    if peak_mb >= memory_mb:
+        print(f"   stream peak {peak_mb:.0f} MB is over the {memory_mb} MB budget", file=sys.stderr)
+    os.remove(path)
+    return peak_mb < memory_mb
+
+
+class StubPosterHandler(BaseHTTPRequestHandler):
+    """Serves the same JPEG for every poster URL, after an optional delay."""
+    body = b""
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def bench_posters(record, repeat, workdir, latency_ms):
+    from posters import fetch_posters
+    from poster_cache import PosterCache, set_poster_cache
+    from dead_posters import DeadPosterCache, set_dead_posters
+    from thumbnails import THUMB_SIZES
+
+    poster = np.random.default_rng(0).integers(0, 256, (450, 300, 3), dtype=np.uint8)
+    StubPosterHandler.body = cv2.imencode(".jpg", poster)[1].tobytes()
+    StubPosterHandler.latency = latency_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPosterHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    set_dead_posters(DeadPosterCache(os.path.join(workdir, "dead_posters.json")))
+    base = f"http://127.0.0.1:{server.server_address[1]}/posters/"
+    params = {'posters': POSTER_COUNT, 'latency_ms': latency_ms}
+    try:
+        runs = iter(range(repeat))
+
+        def cold():
+            # A fresh cache directory and fresh URLs, so nothing is on disk yet
+            run = next(runs)
+            set_poster_cache(PosterCache(os.path.join(workdir, f"posters_{run}")))
+            fetch_posters([f"{base}{run}/{i}.jpg" for i in range(POSTER_COUNT)], size=THUMB_SIZES['web'])
+
+        record('posters', 'fetch_cold', params, measure(cold, repeat))
+        urls = [f"{base}0/{i}.jpg" for i in range(POSTER_COUNT)]
+        set_poster_cache(PosterCache(os.path.join(workdir, "posters_0")))
+        record('posters', 'fetch_warm', params,
+               measure(lambda: fetch_posters(urls, size=THUMB_SIZES['web']), repeat))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_probe(args, marker, env=None):
+    """Run a fresh interpreter until it prints marker, return its value and when the process was spawned."""
+    started = time.time()
+    proc = subprocess.run([sys.executable] + args, cwd=REPO_DIR, env=env, capture_output=True, text=True,
+                          timeout=STARTUP_TIMEOUT)
+    for line in proc.stdout.splitlines():
+        if line.startswith(marker + " "):
+            return float(line.split()[1]), started
+    errors = proc.stderr.strip().splitlines()
+    raise RuntimeError(errors[-1] if errors else f"exited with {proc.returncode} before {marker}")
+
+
+def bench_startup(record, repeat):
+    """Time each frontend's imports and how long its first frame takes to show after launch."""
+    env = dict(os.environ, EMOREC_STARTUP_PROBE="1", QT_QPA_PLATFORM="offscreen")
+    for name, script, toolkit in FRONTENDS:
+        params = {'frontend': name, 'toolkit': toolkit}
+        path = os.path.join(REPO_DIR, script)
+        module = os.path.splitext(os.path.basename(script))[0]
+        import_code = (f"import sys, time; sys.path[:0] = [{os.path.dirname(path)!r}, {REPO_DIR!r}]; "
+                       f"started = time.perf_counter(); import {module}; "
+                       f"print('IMPORTED', time.perf_counter() - started)")
+        if toolkit == 'streamlit':
+            # A Streamlit page is painted once the first script run is done
+            paint_code = (f"import sys, time; from streamlit.testing.v1 import AppTest; "
+                          f"AppTest.from_file({path!r}, default_timeout={STARTUP_TIMEOUT}).run(); "
+                          f"print('FIRST_PAINT', time.time())")
+            paint_args = ["-c", paint_code]
+        else:
+            paint_args = [path]  # startup.first_paint() prints the time and quits
+        try:
+            imports = [run_probe(["-c", import_code], "IMPORTED", env)[0] for _ in range(repeat)]
+            record('startup', 'import', params, summarize(imports))
+            paints = []
+            for _ in range(repeat):
+                painted, started = run_probe(paint_args, "FIRST_PAINT", env)
+                paints.append(painted - started)
+            record('startup', 'first_paint', params, summarize(paints))
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            record('startup', 'skipped', dict(params, reason=str(e)), None)
+
+
+def compare(results, baseline_path, threshold):
+    """Print each benchmark's median against the baseline run, return the regressed ones."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r['stage'], r['name'], json.dumps(r['params'], sort_keys=True)): r
+                    for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        old = baseline.get((result['stage'], result['name'], json.dumps(result['params'], sort_keys=True)))
+        if not old or not old.get('median_s') or not result.get('median_s'):
+            continue
+        ratio = result['median_s'] / old['median_s']
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['stage']:>9} {result['name']:<22} {json.dumps(result['params']):<36} "
+              f"{old['median_s'] * 1000:10.2f}ms -> {result['median_s'] * 1000:10.2f}ms  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model inference, catalog handling and poster fetching.")
+    parser.add_argument("--stages", default="inference,preprocess,catalog,posters", help="comma separated stages to run")
+    parser.add_argument("--rows", default="10000,100000,1000000",
+                        help="synthetic catalog sizes, comma separated (10000000 works given the memory)")
+    parser.add_argument("--stream-rows", type=int, default=5000000, help="rows of the stream stage's CSV")
+    parser.add_argument("--stream-memory-mb", type=int, default=64,
+                        help="memory budget of the stream stage, its CSV should be several times larger")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the median is compared")
+    parser.add_argument("--frames", help="directory of face images for the inference stage (synthetic if unset)")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0, help="delay of the stub poster server")
+    parser.add_argument("--output", default="bench.json", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+    np.random.seed(0)
+    stages = [stage for stage in args.stages.split(",") if stage]
+    results = []
+    within_memory = True
+
+    def record(stage, name, params, timing):
+        result = {'stage': stage, 'name': name, 'params': params}
+        result.update(timing or {})
+        results.append(result)
+        if timing and 'median_s' in timing:
+            print(f"{stage:>9} {name:<22} {json.dumps(params):<36} {timing['median_s'] * 1000:10.2f}ms", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix="emorec-bench-") as workdir:
+        if 'inference' in stages:
+            bench_inference(record, args.repeat, args.frames)
+        if 'preprocess' in stages:
+            bench_preprocess(record, args.repeat, args.frames)
+        if 'catalog' in stages:
+            for rows in [int(rows) for rows in args.rows.split(",") if rows]:
+                bench_catalog(record, args.repeat, rows, workdir)
+        if 'stream' in stages:
+            within_memory = bench_stream(record, args.repeat, args.stream_rows, workdir, args.stream_memory_mb)
+        if 'posters' in stages:
+            bench_posters(record, args.repeat, workdir, args.stub_latency_ms)
+        if 'startup' in stages:
+            bench_startup(record, args.repeat)
+
+    report = {
+        'meta': {'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpus': os.cpu_count(), 'pandas': pd.__version__,
+                 'numpy': np.__version__, 'repeat': args.repeat},
+        'results': results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        return 1
+    return 0 if within_memory else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
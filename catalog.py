@@ -0,0 +1,265 @@
+import os
+import numpy as np
+import pandas as pd
+
+DEAD_POSTER_WEIGHT = 0.0  # 0 skips known-dead posters, between 0 and 1 only makes them less likely
+CATALOG_COLUMNS = ['Title', 'Genre', 'Poster']  # All the apps need from the catalog
+CATALOG_CACHE_SUFFIX = ".pkl"  # Parsed copy kept next to the CSV
+GENRE_TOKEN = r"[A-Za-z][A-Za-z-]*"  # One genre in "['Action', 'Sci-Fi']" or "Action|Sci-Fi"
+STREAM_CHUNK_ROWS = 200_000  # Rows StreamingCatalog parses at a time, under ~100 MB at peak for a catalog like ours
+
+# Default genres for each emotion FER reports
+EMOTION_GENRES = {
+    'angry': ['Action', 'Thriller', 'Crime'],
+    'disgust': ['Horror', 'Drama'],
+    'fear': ['Thriller', 'Horror', 'Mystery'],
+    'happy': ['Comedy', 'Romance', 'Animation'],
+    'sad': ['Drama', 'Romance', 'Biography'],
+    'surprise': ['Sci-Fi', 'Adventure', 'Fantasy'],
+    'neutral': ['Documentary', 'Drama']
+}
+
+
+def load_catalog(path="cleanest_movie.csv", columns=CATALOG_COLUMNS):
+    """Load the catalog columns the apps use, much faster than a full read_csv after the first time.
+
+    Genre becomes a categorical (the same few hundred combinations repeat across the
+    catalog) and the parsed frame is pickled next to the CSV, it is rebuilt whenever
+    the CSV is newer.
+    """
+    cache_path = path + CATALOG_CACHE_SUFFIX
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            movies = pd.read_pickle(cache_path)
+            if list(movies.columns) == list(columns):
+                movies.attrs['version'] = catalog_version(path)
+                return movies
+    except (OSError, ValueError, EOFError):
+        pass  # No usable cache, parse the CSV
+    movies = pd.read_csv(path, usecols=columns, dtype={'Genre': 'category'})[columns]
+    try:
+        movies.to_pickle(cache_path + ".tmp")
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError:
+        pass  # Read-only catalog directory, the next load parses the CSV again
+    movies.attrs['version'] = catalog_version(path)
+    return movies
+
+
+def catalog_version(path):
+    """Changes whenever the catalog file does, keys caches of results computed from it."""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class GenreIndex:
+    """Row positions of the movies in each genre, built once per catalog.
+
+    Replaces a str.contains or apply scan over every row with array lookups. Genres
+    match whole names, so 'Music' no longer also matches 'Musical'.
+    """
+
+    def __init__(self, genres):
+        # Parse each distinct genre combination once rather than every row
+        codes, combos = pd.factorize(genres)
+        combos_by_genre = {}
+        for combo, names in enumerate(pd.Series(np.asarray(combos, dtype=object)).str.findall(GENRE_TOKEN)):
+            for name in names if isinstance(names, list) else ():
+                combos_by_genre.setdefault(name, []).append(combo)
+        self.rows = {genre: np.flatnonzero(np.isin(codes, combo_codes)).astype(np.int32)
+                     for genre, combo_codes in combos_by_genre.items()}
+
+    def positions(self, genres):
+        """Sorted positions of the movies in any of the genres."""
+        found = [self.rows[genre] for genre in genres if genre in self.rows]
+        if not found:
+            return np.array([], dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    def filter(self, movies, genres):
+        """The movies in any of the genres, the indexed replacement for filter_movs()."""
+        return movies.iloc[self.positions(genres)]
+
+
+def sample_movies(movies, n, dead_posters=None, dead_weight=DEAD_POSTER_WEIGHT, weights=None, skip_titles=None):
+    """Randomly pick up to n movies, skipping or down-weighting ones whose poster is known dead.
+
+    Falls back to dead-poster movies only when there are not enough others to fill the grid.
+    weights, when given, are per-movie sampling weights aligned with movies. skip_titles
+    (the recently shown ones, say) are only picked once everything else is.
+    """
+    n = min(n, len(movies))
+    if n <= 0:
+        return movies.head(0)  # pandas rejects weights that sum to zero, even for an empty sample
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+    if skip_titles:
+        seen = movies['Title'].isin(skip_titles).to_numpy()
+        if seen.any():
+            fresh = sample_movies(movies[~seen], n, dead_posters, dead_weight,
+                                  None if weights is None else weights[~seen])
+            if len(fresh) >= n:
+                return fresh
+            return pd.concat([fresh, sample_movies(movies[seen], n - len(fresh), dead_posters, dead_weight,
+                                                   None if weights is None else weights[seen])])
+    if dead_posters is None:
+        return movies.sample(n=n, weights=weights)
+    dead = movies['Poster'].isin(dead_posters.dead_urls()).to_numpy()
+    if not dead.any():
+        return movies.sample(n=n, weights=weights)
+    if dead_weight > 0:
+        dead_weights = np.where(dead, dead_weight, 1.0)
+        return movies.sample(n=n, weights=dead_weights if weights is None else dead_weights * weights)
+    alive = movies[~dead]
+    if len(alive) >= n:
+        return alive.sample(n=n, weights=None if weights is None else weights[~dead])
+    return pd.concat([alive.sample(frac=1), movies[dead].sample(n=n - len(alive))])
+
+
+def unseen_first(movies, titles):
+    """The movies not in titles (recently shown ones, say) followed by those that are."""
+    if not titles:
+        return movies
+    seen = movies['Title'].isin(titles).to_numpy()
+    if not seen.any():
+        return movies
+    return pd.concat([movies[~seen], movies[seen]])
+
+
+def genre_weights(distribution, preferences=None):
+    """Turn an {emotion: probability} distribution into {genre: weight}.
+
+    Each emotion contributes its probability to its preferred genres, or to the
+    EMOTION_GENRES defaults when the user picked none for it.
+    """
+    preferences = preferences or {}
+    weights = {}
+    for emotion, probability in distribution.items():
+        if probability <= 0:
+            continue
+        for genre in preferences.get(emotion) or EMOTION_GENRES.get(emotion, ['Drama']):
+            weights[genre] = weights.get(genre, 0.0) + probability
+    return weights
+
+
+def genre_scores(movies, weights, index=None):
+    """Each movie's best matching genre weight, 0 for movies in none of the genres."""
+    scores = np.zeros(len(movies))
+    for genre, weight in weights.items():
+        if index is not None:
+            rows = index.rows.get(genre, [])
+            scores[rows] = np.maximum(scores[rows], weight)
+            continue
+        matches = movies['Genre'].str.contains(genre, regex=False, na=False).to_numpy()
+        scores = np.where(matches, np.maximum(scores, weight), scores)
+    return scores
+
+
+def recommend(movies, distribution, preferences=None, n=16, dead_posters=None, index=None):
+    """Sample n movies matching the genres of the emotion distribution.
+
+    A movie is weighted by its best matching genre, so a mostly happy face with a
+    little surprise gets mostly comedies and the odd sci-fi film. Pass the catalog's
+    GenreIndex to look genres up instead of scanning the Genre column.
+    """
+    scores = genre_scores(movies, genre_weights(distribution, preferences), index)
+    matching = scores > 0
+    if not matching.any():
+        return movies.head(0)  # None of the genres are in the catalog
+    return sample_movies(movies[matching], n, dead_posters=dead_posters, weights=scores[matching])
+
+
+class Reservoir:
+    """Weighted random sample of up to n rows from frames offered one at a time.
+
+    Efraimidis-Spirakis: every row gets the key log(u) / weight and the n largest
+    keys are kept, which is the same distribution as sampling without replacement
+    from all the rows at once. Only n rows are ever held.
+    """
+
+    def __init__(self, n, rng=None):
+        self.n = n
+        self.rng = rng or np.random.default_rng()
+        self.rows = None
+        self.keys = np.array([])
+
+    def offer(self, frame, weights=None):
+        if self.n <= 0 or len(frame) == 0:
+            return
+        keys = np.log(self.rng.random(len(frame)))
+        if weights is not None:
+            keys = keys / np.asarray(weights, dtype=float)
+        if self.rows is not None:
+            frame = pd.concat([self.rows, frame])
+            keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.n:
+            keep = np.argpartition(keys, len(keys) - self.n)[-self.n:]
+            frame, keys = frame.iloc[keep], keys[keep]
+        self.rows, self.keys = frame, keys
+
+    def result(self):
+        """The sampled rows, most likely picks first."""
+        if self.rows is None:
+            return None
+        return self.rows.iloc[np.argsort(-self.keys, kind="stable")]
+
+
+class StreamingCatalog:
+    """A catalog filtered and sampled straight from the CSV, a chunk at a time.
+
+    For catalogs too large to load: memory holds one chunk and the picked movies
+    however many rows the file has, at the price of a full read per query. The
+    picks follow recommend() and sample_movies() on the loaded catalog, with genres
+    matched as whole names like GenreIndex does.
+    """
+
+    def __init__(self, path="cleanest_movie.csv", chunk_rows=STREAM_CHUNK_ROWS, columns=CATALOG_COLUMNS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.columns = columns
+        self.empty = pd.read_csv(path, usecols=columns, nrows=0)[columns]  # Fails early on a bad file
+
+    def chunks(self):
+        with pd.read_csv(self.path, usecols=self.columns, chunksize=self.chunk_rows,
+                         dtype={'Genre': 'category'}) as reader:
+            for chunk in reader:
+                yield chunk[self.columns]
+
+    def filter(self, genres):
+        """Yield the movies of each chunk that are in any of the genres."""
+        for chunk in self.chunks():
+            matches = GenreIndex(chunk['Genre']).filter(chunk, genres)
+            if len(matches):
+                yield matches
+
+    def sample(self, weights, n, dead_posters=None, dead_weight=DEAD_POSTER_WEIGHT, rng=None):
+        """Pick up to n movies, each weighted by its best matching genre in {genre: weight}.
+
+        Dead posters are skipped or down-weighted as in sample_movies(), and still fill
+        the grid when there are not enough other matches.
+        """
+        rng = rng or np.random.default_rng()
+        dead_urls = dead_posters.dead_urls() if dead_posters is not None else ()
+        picked = Reservoir(n, rng)
+        fallback = Reservoir(n, rng)  # Dead-poster matches, only used when dead_weight is 0
+        for chunk in self.chunks():
+            scores = genre_scores(chunk, weights, GenreIndex(chunk['Genre']))
+            matching = scores > 0
+            chunk, scores = chunk[matching], scores[matching]
+            if dead_urls and len(chunk):
+                dead = chunk['Poster'].isin(dead_urls).to_numpy()
+                if dead_weight > 0:
+                    scores = np.where(dead, scores * dead_weight, scores)
+                else:
+                    fallback.offer(chunk[dead], scores[dead])
+                    chunk, scores = chunk[~dead], scores[~dead]
+            picked.offer(chunk, scores)
+        movies = picked.result()
+        movies = self.empty if movies is None else movies
+        if len(movies) < n and fallback.rows is not None:
+            movies = pd.concat([movies, fallback.result().iloc[:n - len(movies)]])
+        return movies
+
+    def recommend(self, distribution, preferences=None, n=16, dead_posters=None, rng=None):
+        """recommend() for a catalog that stays on disk."""
+        return self.sample(genre_weights(distribution, preferences), n, dead_posters=dead_posters, rng=rng)
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import threading
+from poster_cache import CACHE_DIR, FileLock, atomic_write
+
+DEAD_POSTERS_PATH = os.environ.get(
+    "EMOREC_DEAD_POSTERS", os.path.join(os.path.dirname(CACHE_DIR), "dead_posters.json"))
+# How long a failure is trusted before the URL is checked again, doubled on every repeat failure
+BASE_TTL = {
+    '404': 24 * 3600,
+    '410': 24 * 3600,
+    'timeout': 3600,
+}
+DEFAULT_TTL = 6 * 3600
+MAX_TTL = 30 * 24 * 3600
+
+
+class DeadPosterCache:
+    """Persistent negative cache of poster URLs that failed, with exponential re-check.
+
+    Entries map a URL to its failure kind ('404', 'timeout', ...), how many times in
+    a row it failed and when it may be tried again.
+    """
+
+    def __init__(self, path=DEAD_POSTERS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        self._changed = set()  # URLs recorded since the last save(), the only ones it writes
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_dead(self, url):
+        """True while a recorded failure for the URL has not expired yet."""
+        entry = self._entries.get(url)
+        return bool(entry) and time.time() < entry["retry_at"]
+
+    def failure(self, url):
+        """The kind of the recorded failure ('404', 'timeout', ...) while it has not expired, else None."""
+        entry = self._entries.get(url)
+        return entry["kind"] if entry and time.time() < entry["retry_at"] else None
+
+    def dead_urls(self):
+        now = time.time()
+        with self._lock:
+            return {url for url, entry in self._entries.items() if entry and now < entry["retry_at"]}
+
+    def record_failure(self, url, kind):
+        now = time.time()
+        with self._lock:
+            failures = (self._entries.get(url) or {}).get("failures", 0) + 1
+            ttl = min(BASE_TTL.get(kind, DEFAULT_TTL) * 2 ** (failures - 1), MAX_TTL)
+            self._entries[url] = {"kind": kind, "failures": failures,
+                                  "checked_at": now, "retry_at": now + ttl}
+            self._changed.add(url)
+
+    def record_success(self, url):
+        with self._lock:
+            if self._entries.get(url):
+                self._entries[url] = None  # Tombstone so save() drops it from the file too
+                self._changed.add(url)
+
+    def save(self):
+        """Merge the URLs changed here since the last save into the file and persist atomically.
+
+        Entries this process only read are left as the file has them, so a stale copy
+        never overwrites what another process recorded since.
+        """
+        with self._lock:
+            if not self._changed:
+                return
+            changes = {url: self._entries.get(url) for url in self._changed}
+            self._changed = set()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with FileLock(self.path + ".lock"):
+                merged = self._read()
+                for url, entry in changes.items():
+                    if entry is None:
+                        merged.pop(url, None)
+                    elif url not in merged or merged[url]["checked_at"] <= entry["checked_at"]:
+                        merged[url] = entry
+                atomic_write(self.path, json.dumps(merged).encode("utf-8"))
+        except OSError:
+            with self._lock:
+                self._changed.update(changes)  # Written by the next save()
+            raise
+        with self._lock:
+            # Take the file as it now is, keeping only what changed here while we were writing
+            pending = {url: self._entries.get(url) for url in self._changed}
+            self._entries = merged
+            self._entries.update(pending)
+
+
+_default_dead = None
+_default_lock = threading.Lock()
+
+
+def get_dead_posters():
+    """Return the process-wide dead poster cache."""
+    global _default_dead
+    with _default_lock:
+        if _default_dead is None:
+            _default_dead = DeadPosterCache()
+        return _default_dead
+
+
+def set_dead_posters(dead):
+    """Replace the process-wide dead poster cache, e.g. to keep it in the app's private data dir."""
+    global _default_dead
+    with _default_lock:
+        _default_dead = dead
@@ -0,0 +1,146 @@
+import threading
+import cv2
+import numpy as np
+from metrics import timed
+
+PADDING = 40  # Border FER adds around the gray frame so face offsets never leave the image
+FACE_OFFSETS = (10, 10)  # FER's default margin around a detected face
+TARGET_SIZE = (64, 64)  # Input size of FER's emotion classifier
+BATCH_CAPACITY = 8  # Faces the preprocessing batch holds before it grows
+
+
+def tosquare(box):
+    """FER.tosquare(): grow the shorter side so the box is square, keeping it centred."""
+    x, y, w, h = box
+    if h > w:
+        x -= (h - w) // 2
+        w = h
+    elif w > h:
+        y -= (w - h) // 2
+        h = w
+    return x, y, w, h
+
+
+class FaceBuffers:
+    """Arrays face preprocessing reuses from frame to frame, one set per thread.
+
+    OpenCV writes the gray frame, its padded copy and each resized face straight into
+    them (dst=), and the normalized faces go into the rows of a float32 batch that is
+    handed to the classifier as is. OpenCV replaces a dst of any other shape, so the
+    frame buffers are reallocated whenever the frame size changes and reused while it
+    stays the same, as it does for one camera. The batch only ever grows.
+    """
+
+    def __init__(self, target_size=TARGET_SIZE, capacity=BATCH_CAPACITY):
+        self.gray = None
+        self.padded = None
+        self.face = np.empty(target_size[::-1], np.uint8)
+        self.batch = np.empty((capacity,) + target_size[::-1], np.float32)
+
+    def row(self, i):
+        """Row i of the batch, growing it (and keeping the rows before i) when it is full."""
+        if i >= len(self.batch):
+            grown = np.empty((max(i + 1, 2 * len(self.batch)),) + self.batch.shape[1:], np.float32)
+            grown[:i] = self.batch[:i]
+            self.batch = grown
+        return self.batch[i]
+
+
+def preprocess_faces(frame, boxes, buffers, start=0, offsets=FACE_OFFSETS, target_size=TARGET_SIZE):
+    """Write the faces of a BGR frame into buffers.batch from row start, return the boxes kept.
+
+    The same crops and values as FER.detect_emotions(), without allocating per frame.
+    """
+    buffers.gray = gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buffers.gray)
+    # FER.pad(): a border the colour of the bottom two rows
+    mean = cv2.mean(gray[-2:])[0]
+    buffers.padded = padded = cv2.copyMakeBorder(gray, PADDING, PADDING, PADDING, PADDING, cv2.BORDER_CONSTANT,
+                                                 dst=buffers.padded, value=[mean, mean, mean])
+    kept = []
+    x_off, y_off = offsets
+    for box in boxes if boxes is not None else ():
+        x, y, w, h = tosquare(box)
+        x1 = max(0, x - x_off + PADDING)
+        y1 = max(0, y - y_off + PADDING)
+        face = padded[y1:y + h + y_off + PADDING, x1:x + w + x_off + PADDING]
+        if face.size == 0:
+            continue
+        cv2.resize(face, target_size, dst=buffers.face)
+        row = buffers.row(start + len(kept))
+        np.copyto(row, buffers.face)
+        row /= 255.0
+        row -= 0.5
+        row *= 2.0
+        kept.append(box)
+    return kept
+
+
+class EmotionModel:
+    """FER loaded once, classifying the faces of many frames in a single model call.
+
+    FER.detect_emotions() runs the classifier once per frame. predict() finds the faces
+    of every frame first and then classifies all of them together, which is what lets
+    a server coalesce concurrent requests. The face crops and scores match FER's own.
+    """
+
+    def __init__(self, detector=None, mtcnn=True):
+        from fer import FER  # Brings TensorFlow and MTCNN, only paid for when a model is built
+        self.detector = detector or FER(mtcnn=mtcnn)
+        self.labels = FER._get_labels()
+        # FER keeps these name-mangled, fall back to its defaults if they move
+        self.offsets = getattr(self.detector, '_FER__offsets', FACE_OFFSETS)
+        self.target_size = tuple(getattr(self.detector, '_FER__emotion_target_size', TARGET_SIZE))
+        self._local = threading.local()  # FaceBuffers of each thread using the model
+
+    def buffers(self):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = FaceBuffers(self.target_size)
+        return buffers
+
+    def face_crops(self, frame, start=0):
+        """Detect the faces in a BGR frame and preprocess them into this thread's batch, return their boxes."""
+        with timed('face_detection'):
+            boxes = self.detector.find_faces(frame, bgr=True)
+        with timed('preprocess'):
+            return preprocess_faces(frame, boxes, self.buffers(), start, self.offsets, self.target_size)
+
+    def predict(self, frames):
+        """Return, for every frame, a detect_emotions() style list of {'box', 'emotions'}."""
+        per_frame = []
+        total = 0
+        for frame in frames:
+            boxes = self.face_crops(frame, total)
+            per_frame.append(boxes)
+            total += len(boxes)
+        scores = []
+        if total:
+            with timed('classification'):
+                scores = np.asarray(self.detector._classify_emotions(self.buffers().batch[:total]))
+        results = []
+        start = 0
+        for boxes in per_frame:
+            faces = []
+            for box, face_scores in zip(boxes, scores[start:start + len(boxes)]):
+                emotions = {self.labels[i]: round(float(score), 2) for i, score in enumerate(face_scores)}
+                faces.append({'box': [int(v) for v in box], 'emotions': emotions})
+            start += len(boxes)
+            results.append(faces)
+        return results
+
+    def detect(self, frame):
+        """detect_emotions() for a single frame, with the detection and classification timed."""
+        return self.predict([frame])[0]
+
+
+def decode_image(data):
+    """Decode JPEG/PNG bytes into a BGR frame, None when they are not an image."""
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def top_emotion(faces):
+    """Emotion with the highest score on the first face, the same pick as FER.top_emotion()."""
+    if not faces:
+        return None
+    emotions = faces[0]['emotions']
+    return max(emotions, key=emotions.get)
@@ -0,0 +1,196 @@
+"""What the user picked, felt and was shown, kept across restarts in a local SQLite file.
+
+    history = get_history()
+    history.save_preferences({'happy': ['Comedy']})
+    history.record_detection('happy', {'happy': 0.91, 'neutral': 0.05})
+    history.record_impressions(['Up', 'Amelie'], emotion='happy')
+    recent = history.recent_titles()  # Titles the next recommendations skip
+
+The database runs in WAL mode so the UI reads while a writer thread commits. Writes
+are queued and committed in batches by that thread, never on the caller's.
+
+Emotions are stored under the FER labels catalog.EMOTION_GENRES is keyed by ('angry',
+'happy', ...), the names some frontends use ('anger', 'happiness', ...) are mapped to them.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from poster_cache import CACHE_DIR
+
+HISTORY_PATH = os.environ.get("EMOREC_HISTORY_DB", os.path.join(os.path.dirname(CACHE_DIR), "history.db"))
+RECENT_DAYS = float(os.environ.get("EMOREC_RECENT_DAYS", 7))  # Shown titles are skipped for this long
+FLUSH_INTERVAL = 0.5  # Seconds the writer gathers queued writes before committing them together
+MAX_BATCH = 500  # Writes per transaction
+DEFAULT_USER = os.environ.get("EMOREC_USER", "default")  # Whose history a kiosk keeps when no one else is named
+EMOTION_ALIASES = {'anger': 'angry', 'happiness': 'happy', 'sadness': 'sad'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS preferences (
+    user TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    genres TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user, emotion)
+);
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    scores TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS detections_user_ts ON detections (user, ts);
+CREATE TABLE IF NOT EXISTS impressions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    title TEXT NOT NULL,
+    emotion TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS impressions_user_ts_title ON impressions (user, ts, title);
+"""
+
+
+def emotion_label(emotion):
+    """The FER label for an emotion name, e.g. 'happy' for 'happiness'."""
+    return EMOTION_ALIASES.get(emotion, emotion)
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # Durable enough with WAL, no fsync per commit
+    return connection
+
+
+class HistoryStore:
+    """Preferences, detected emotions and shown movies in one SQLite database.
+
+    Reads use a connection per calling thread and see everything committed so far,
+    writes made in the last FLUSH_INTERVAL may still be queued (flush() waits for them).
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _connect(path) as connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+        self._readers = threading.local()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="history-writer")
+        self._writer.start()
+
+    def _reader(self):
+        connection = getattr(self._readers, 'connection', None)
+        if connection is None:
+            connection = self._readers.connection = _connect(self.path)
+        return connection
+
+    def _write(self, sql, params):
+        self._queue.put((sql, params))
+
+    def save_preferences(self, preferences, user=DEFAULT_USER):
+        """Store {emotion: [genres]}, replacing what was saved for those emotions."""
+        now = time.time()
+        for emotion, genres in preferences.items():
+            self._write("INSERT INTO preferences (user, emotion, genres, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (user, emotion) DO UPDATE SET genres = excluded.genres, "
+                        "updated_at = excluded.updated_at",
+                        (user, emotion_label(emotion), json.dumps(list(genres)), now))
+
+    def load_preferences(self, user=DEFAULT_USER):
+        rows = self._reader().execute("SELECT emotion, genres FROM preferences WHERE user = ? ORDER BY updated_at",
+                                      (user,))
+        return {emotion_label(emotion): json.loads(genres) for emotion, genres in rows}  # Newest wins
+
+    def record_detection(self, emotion, scores=None, user=DEFAULT_USER):
+        self._write("INSERT INTO detections (user, emotion, scores, ts) VALUES (?, ?, ?, ?)",
+                    (user, emotion_label(emotion), json.dumps(scores) if scores else None, time.time()))
+
+    def recent_emotions(self, limit=20, user=DEFAULT_USER):
+        """The latest detections as (timestamp, emotion), newest first."""
+        return self._reader().execute("SELECT ts, emotion FROM detections WHERE user = ? ORDER BY ts DESC LIMIT ?",
+                                      (user, limit)).fetchall()
+
+    def record_impressions(self, titles, emotion=None, user=DEFAULT_USER):
+        now = time.time()
+        for title in titles:
+            if isinstance(title, str):
+                self._write("INSERT INTO impressions (user, title, emotion, ts) VALUES (?, ?, ?, ?)",
+                            (user, title, emotion and emotion_label(emotion), now))
+
+    def recent_titles(self, days=RECENT_DAYS, user=DEFAULT_USER):
+        """Titles shown in the last days, read from the (user, ts, title) index alone."""
+        rows = self._reader().execute("SELECT DISTINCT title FROM impressions WHERE user = ? AND ts >= ?",
+                                      (user, time.time() - days * 86400))
+        return {title for title, in rows}
+
+    def flush(self, timeout=None):
+        """Wait until every write queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Commit what is queued and stop the writer."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _write_loop(self):
+        connection = _connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            # Gather what arrives shortly after, one transaction is far cheaper than one per write
+            while len(batch) < MAX_BATCH and not isinstance(batch[-1], threading.Event) and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            writes = [item for item in batch if isinstance(item, tuple)]
+            if writes:
+                try:
+                    with connection:
+                        for sql, params in writes:
+                            connection.execute(sql, params)
+                except sqlite3.Error as e:
+                    print(f"History not saved: {e}", file=sys.stderr)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    stopping = True
+        connection.close()
+
+
+_default_history = None
+_default_lock = threading.Lock()
+
+
+def get_history():
+    """Return the process-wide store, its queued writes are committed at exit."""
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = HistoryStore()
+            atexit.register(_default_history.close)
+        return _default_history
+
+
+def set_history(history):
+    """Replace the process-wide store, e.g. to keep it in the app's private data dir on Android."""
+    global _default_history
+    with _default_lock:
+        if _default_history is not None and _default_history is not history:
+            _default_history.close()
+        _default_history = history
+        atexit.register(history.close)
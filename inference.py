@@ -0,0 +1,155 @@
+"""One emotion model per process, shared by every session through a fair queue.
+
+Streamlit runs each session's script on its own thread. Without a scheduler every
+session builds its own FER and TensorFlow gives each of them all the cores. Here a
+few workers own the model and take frames round-robin across sessions, so a
+session sending frames in a tight loop cannot starve the others:
+
+    EMOREC_INFERENCE_WORKERS=1   threads calling the model (they share one copy)
+    EMOREC_INFERENCE_BATCH=8     frames classified per model call, from different sessions
+    EMOREC_TF_INTRA_OP=0         TensorFlow threads per op (0: cores / workers)
+    EMOREC_TF_INTER_OP=1         ops TensorFlow runs concurrently
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from metrics import observe, timed
+
+WORKERS = int(os.environ.get("EMOREC_INFERENCE_WORKERS", 1))
+MAX_BATCH = int(os.environ.get("EMOREC_INFERENCE_BATCH", 8))
+INTRA_OP_THREADS = int(os.environ.get("EMOREC_TF_INTRA_OP", 0))
+INTER_OP_THREADS = int(os.environ.get("EMOREC_TF_INTER_OP", 1))
+WAIT_WINDOW = 256  # Recent queue waits the stats are computed over
+
+_threads_configured = False
+
+
+def configure_threads(intra_op=INTRA_OP_THREADS, inter_op=INTER_OP_THREADS, workers=WORKERS):
+    """Give TensorFlow its thread budget, only takes effect before the first model is built."""
+    global _threads_configured
+    if _threads_configured:
+        return
+    _threads_configured = True
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return
+    intra_op = intra_op or max(1, (os.cpu_count() or 1) // max(1, workers))
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    except RuntimeError:
+        pass  # TensorFlow is already running, it keeps the threads it started with
+
+
+class InferenceScheduler:
+    """Worker threads running one shared EmotionModel for many owners (sessions).
+
+    load() returns the model and is called once, by the first worker that needs it.
+    Pending frames are queued per owner and taken one owner at a time, so every
+    waiting session gets a frame into each batch.
+    """
+
+    def __init__(self, load, workers=WORKERS, max_batch=MAX_BATCH):
+        self.load = load
+        self.max_batch = max_batch
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._queues = {}  # owner -> deque of (frame, future, queued_at)
+        self._turns = deque()  # Owners with pending frames, in the order they are served
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self._stopped = False
+        self.batches = 0
+        self.frames = 0
+        self._workers = [threading.Thread(target=self._run, daemon=True, name=f"inference-{i}")
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, owner, frame):
+        """Queue a BGR frame, the future resolves to its faces as EmotionModel.detect() returns them."""
+        future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Inference scheduler is stopped")
+            queue = self._queues.get(owner)
+            if queue is None:
+                queue = self._queues[owner] = deque()
+                self._turns.append(owner)
+            queue.append((frame, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def detect(self, owner, frame, timeout=None):
+        return self.submit(owner, frame).result(timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                'pending': sum(len(queue) for queue in self._queues.values()),
+                'waiting_owners': len(self._queues),
+                'batches': self.batches,
+                'frames': self.frames,
+                'mean_batch_size': self.frames / self.batches if self.batches else 0.0,
+                'mean_wait_s': sum(waits) / len(waits) if waits else 0.0,
+                'p95_wait_s': waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            }
+
+    def _model_or_load(self):
+        with self._load_lock:
+            if self._model is None:
+                self._model = self.load()
+            return self._model
+
+    def _next_batch(self):
+        """Up to max_batch frames, one per owner per round, blocks while there are none."""
+        with self._cond:
+            while not self._turns and not self._stopped:
+                self._cond.wait()
+            batch = []
+            while self._turns and len(batch) < self.max_batch:
+                owner = self._turns.popleft()
+                queue = self._queues[owner]
+                batch.append(queue.popleft())
+                if queue:
+                    self._turns.append(owner)
+                else:
+                    del self._queues[owner]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # Stopped
+            started = time.perf_counter()
+            batch = [(frame, future, queued_at) for frame, future, queued_at in batch
+                     if future.set_running_or_notify_cancel()]
+            for _, _, queued_at in batch:
+                observe('inference_wait', started - queued_at)
+            with self._cond:
+                self._waits.extend(started - queued_at for _, _, queued_at in batch)
+            if not batch:
+                continue
+            try:
+                model = self._model_or_load()
+                with timed('inference', batch=len(batch)):
+                    results = model.predict([frame for frame, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+            for (_, future, _), faces in zip(batch, results):
+                future.set_result(faces)
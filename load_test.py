@@ -0,0 +1,89 @@
+"""Load test for service.py on localhost.
+
+    python service.py &
+    python load_test.py --endpoint emotion --image face.jpg --concurrency 32 --duration 30
+
+Each client sends requests back to back for --duration seconds. The report has the
+throughput, latency percentiles and, for /emotion, the mean micro-batch size the
+server ran the requests in.
+"""
+import sys
+import time
+import json
+import asyncio
+import argparse
+import aiohttp
+
+RECOMMEND_BODY = {'emotions': {'happy': 0.7, 'surprise': 0.2, 'neutral': 0.1}, 'n': 16}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def client(session, url, request_kwargs, stop_at, latencies, batch_sizes, errors):
+    while time.monotonic() < stop_at:
+        started = time.monotonic()
+        try:
+            async with session.post(url, **request_kwargs) as response:
+                body = await response.read()
+                if response.status != 200:
+                    errors[response.status] = errors.get(response.status, 0) + 1
+                    continue
+        except aiohttp.ClientError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        latencies.append(time.monotonic() - started)
+        batch_size = json.loads(body).get('batch_size')
+        if batch_size:
+            batch_sizes.append(batch_size)
+
+
+async def run(base_url, endpoint, image_path, concurrency, duration):
+    url = f"{base_url.rstrip('/')}/{endpoint}"
+    if endpoint == "emotion":
+        with open(image_path, "rb") as f:
+            request_kwargs = {'data': f.read(), 'headers': {'Content-Type': 'image/jpeg'}}
+    else:
+        request_kwargs = {'json': RECOMMEND_BODY}
+    latencies, batch_sizes, errors = [], [], {}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.monotonic()
+        stop_at = started + duration
+        await asyncio.gather(*[client(session, url, request_kwargs, stop_at, latencies, batch_sizes, errors)
+                               for _ in range(concurrency)])
+        elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_batch_size': sum(batch_sizes) / len(batch_sizes) if batch_sizes else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the emotion/recommendation service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="base URL of service.py")
+    parser.add_argument("--endpoint", choices=["emotion", "recommend"], default="emotion")
+    parser.add_argument("--image", default="default_poster.jpg",
+                        help="JPEG sent to /emotion, use one with a face to exercise the classifier")
+    parser.add_argument("--concurrency", type=int, default=16, help="clients sending requests at once")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.url, args.endpoint, args.image, args.concurrency, args.duration))
+    print(json.dumps(report, indent=2))
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+"""Starts the phone app, the entry point python-for-android looks for.
+
+phone/buildozer.spec packages the repository root so the modules the phone app
+shares with the desktop apps are in the APK, this file runs phone/movie1.py there.
+"""
+import os
+import runpy
+
+runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "phone", "movie1.py"), run_name="__main__")
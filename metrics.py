@@ -0,0 +1,227 @@
+"""Per-stage latency histograms and counters for the detect -> recommend -> render flow.
+
+Off unless configured, timed() then hands back a shared no-op context manager:
+
+    EMOREC_METRICS=1                 collect, read them with render_prometheus()
+    EMOREC_METRICS_FILE=path.prom    also write the Prometheus text there (at exit and on flush())
+    EMOREC_METRICS_PORT=9100         also serve it on http://127.0.0.1:9100/metrics
+    EMOREC_METRICS_LOG=path.jsonl    also log every observation as a JSON line ("-" for stderr)
+
+    with timed('face_detection'):
+        boxes = detector.find_faces(frame)
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import bisect
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Seconds
+METRICS_FILE = os.environ.get("EMOREC_METRICS_FILE")
+METRICS_PORT = os.environ.get("EMOREC_METRICS_PORT")
+METRICS_LOG = os.environ.get("EMOREC_METRICS_LOG")
+ENABLED = os.environ.get("EMOREC_METRICS", "") not in ("", "0") or bool(METRICS_FILE or METRICS_PORT or METRICS_LOG)
+APP_NAME = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv and sys.argv[0] else "python"))[0]
+
+_NOOP = nullcontext()
+_listeners = []  # Told when stages start and finish, see add_listener()
+
+
+def _label_text(labels):
+    return ",".join(f'{name}="{str(value)}"'.replace("\n", " ") for name, value in labels)
+
+
+class _Timer:
+    __slots__ = ('registry', 'stage', 'labels', 'started', 'tokens')
+
+    def __init__(self, registry, stage, labels):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.tokens = [listener.stage_started(self.stage) for listener in _listeners]
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        self.registry.observe(self.stage, seconds, self.labels, error=exc_type is not None)
+        for listener, token in zip(_listeners, self.tokens):
+            listener.stage_finished(self.stage, seconds, token)
+        return False
+
+
+class MetricsRegistry:
+    """Thread-safe stage histograms and counters, labelled with the app that recorded them."""
+
+    def __init__(self, app=APP_NAME, log_path=METRICS_LOG):
+        self.app = app
+        self._lock = threading.Lock()
+        self._histograms = {}  # (stage, labels) -> [bucket counts..., +Inf count, sum]
+        self._counters = {}  # (name, labels) -> value
+        self._log = None
+        if log_path == "-":
+            self._log = sys.stderr
+        elif log_path:
+            self._log = open(log_path, "a", encoding="utf-8", buffering=1)
+
+    def timer(self, stage, **labels):
+        return _Timer(self, stage, tuple(sorted(labels.items())))
+
+    def observe(self, stage, seconds, labels=(), error=False):
+        key = (stage, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+            if error:
+                self._counters[('stage_errors', key)] = self._counters.get(('stage_errors', key), 0) + 1
+            if self._log:
+                entry = {'ts': round(time.time(), 3), 'app': self.app, 'stage': stage,
+                         'seconds': round(seconds, 6), 'error': error}
+                entry.update(labels)
+                self._log.write(json.dumps(entry) + "\n")
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """{'histograms': {...}, 'counters': {...}} keyed by readable metric names, for JSON output."""
+        with self._lock:
+            histograms = {f"{stage}{{{_label_text(labels)}}}": {'count': sum(counts[:-1]), 'sum': counts[-1]}
+                          for (stage, labels), counts in self._histograms.items()}
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                if name == 'stage_errors':
+                    stage, labels = labels
+                    labels = (('stage', stage),) + labels
+                counters[f"{name}{{{_label_text(labels)}}}"] = value
+        return {'app': self.app, 'histograms': histograms, 'counters': counters}
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        app = ('app', self.app)
+        lines = ["# HELP emorec_stage_seconds Time spent in each stage of the app.",
+                 "# TYPE emorec_stage_seconds histogram"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items(), key=lambda item: repr(item[0]))
+        for (stage, labels), counts in histograms:
+            base = (app, ('stage', stage)) + labels
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), counts[:-1]):
+                cumulative += count
+                lines.append(f"emorec_stage_seconds_bucket{{{_label_text(base + (('le', bound),))}}} {cumulative}")
+            lines.append(f"emorec_stage_seconds_sum{{{_label_text(base)}}} {counts[-1]:.6f}")
+            lines.append(f"emorec_stage_seconds_count{{{_label_text(base)}}} {cumulative}")
+        seen = set()
+        for (name, labels), value in counters:
+            if name == 'stage_errors':
+                stage, labels = labels
+                labels = (('stage', stage),) + labels
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE emorec_{name}_total counter")
+            lines.append(f"emorec_{name}_total{{{_label_text((app,) + labels)}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text atomically, e.g. for node_exporter's textfile collector."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics from a daemon thread, for the desktop frontends that have no web server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, int(port)), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+        return server
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide registry, starting the configured exporters the first time."""
+    global _registry
+    with _lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+            if METRICS_FILE:
+                atexit.register(_registry.write_prometheus, METRICS_FILE)
+            if METRICS_PORT:
+                try:
+                    _registry.serve(METRICS_PORT)
+                except OSError as e:
+                    print(f"Metrics endpoint not started on port {METRICS_PORT}: {e}", file=sys.stderr)
+        return _registry
+
+
+def set_metrics(registry):
+    """Swap the process-wide registry, e.g. for a benchmark run."""
+    global _registry
+    with _lock:
+        _registry = registry
+
+
+def add_listener(listener):
+    """Turn metrics on and report every timed stage to listener.
+
+    listener.stage_started(stage) returns a token that is handed back to
+    listener.stage_finished(stage, seconds, token).
+    """
+    global ENABLED
+    ENABLED = True
+    _listeners.append(listener)
+
+
+def timed(stage, **labels):
+    """Context manager timing one stage, a shared no-op when metrics are off."""
+    if not ENABLED:
+        return _NOOP
+    return get_metrics().timer(stage, **labels)
+
+
+def observe(stage, seconds, **labels):
+    """Record a duration measured elsewhere, e.g. across Qt signal callbacks."""
+    if ENABLED:
+        get_metrics().observe(stage, seconds, tuple(sorted(labels.items())))
+
+
+def count(name, amount=1, **labels):
+    if ENABLED:
+        get_metrics().count(name, amount, **labels)
+
+
+def flush():
+    """Write the Prometheus file now rather than only at exit (Streamlit never really exits)."""
+    if ENABLED and METRICS_FILE:
+        get_metrics().write_prometheus(METRICS_FILE)
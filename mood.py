@@ -0,0 +1,31 @@
+SMOOTHING = 0.3  # Weight of the newest frame in the moving average
+ENTER_THRESHOLD = 0.35  # Smoothed probability an emotion needs before it can become the mood
+SWITCH_MARGIN = 0.1  # How far it must also lead the current mood, so the grid does not flicker
+
+
+class MoodTracker:
+    """Exponentially smoothed emotion distribution with a hysteresis on the reported mood."""
+
+    def __init__(self, smoothing=SMOOTHING, enter_threshold=ENTER_THRESHOLD, switch_margin=SWITCH_MARGIN):
+        self.smoothing = smoothing
+        self.enter_threshold = enter_threshold
+        self.switch_margin = switch_margin
+        self.distribution = {}
+        self.mood = None
+
+    def update(self, emotions):
+        """Fold one frame's {emotion: probability} into the average, True when the mood changed."""
+        if not self.distribution:
+            self.distribution = dict(emotions)
+        else:
+            for name, score in emotions.items():
+                previous = self.distribution.get(name, 0.0)
+                self.distribution[name] = previous + self.smoothing * (score - previous)
+        leader = max(self.distribution, key=self.distribution.get)
+        if leader == self.mood or self.distribution[leader] < self.enter_threshold:
+            return False
+        current = self.distribution.get(self.mood, 0.0) if self.mood else 0.0
+        if self.mood is not None and self.distribution[leader] - current < self.switch_margin:
+            return False
+        self.mood = leader
+        return True
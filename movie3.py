@@ -1,14 +1,18 @@
 import sys
-import cv2
-import pandas as pd
-from fer import FER
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QListWidget,
-    QGridLayout, QStackedWidget, QSizePolicy, QGroupBox, QScrollArea, QHBoxLayout
+    QStackedWidget, QSizePolicy, QCheckBox, QProgressBar, QGroupBox, QHBoxLayout
 )
-from PyQt6.QtGui import QPixmap, QIcon
-from PyQt6.QtCore import QUrl, QThread, pyqtSignal, Qt
-from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import Qt
+from qt_posters import PosterLoader
+from qt_grid import MovieListModel, make_movie_view
+from qt_camera import EmotionDetectionThread, LiveMoodThread, CameraPreview
+from metrics import timed
+import profiling
+from startup import load_emotion_model, load_movies
+from qt_startup import QtPreloader, report_first_paint
+from history import get_history
 
 import os
 
@@ -19,11 +23,18 @@ class EmotionMovieApp(QWidget):
         self.setWindowTitle("Emotion-Based Movie Recommender")
         self.setWindowIcon(QIcon("icon.ico"))
         self.setGeometry(100, 100, 1000, 800)
-        self.emo_detector = FER(mtcnn=True)
-        self.movies = pd.read_csv("cleanest_movie.csv")
-        self.network_manager = QNetworkAccessManager()
-        self.user_preferences = {}  # Stores user-selected genres for each emotion
+        # Loaded in the background once the window is up, see start_loading()
+        self.emo_model = None
+        self.movies = None
+        self.capture_thread = None
+        self.poster_loader = PosterLoader(parent=self)
+        self.movie_model = MovieListModel(self.poster_loader, self)
+        self.history = get_history()  # Preferences, detections and shown movies, kept across restarts
+        self.current_emotion = None
+        self.movie_model.movie_shown.connect(self.on_movie_shown)
+        self.user_preferences = self.history.load_preferences()  # Stores user-selected genres for each emotion
         self.initUI()
+        self.start_loading()
 
     def initUI(self):
         layout = QVBoxLayout(self)
@@ -59,6 +70,9 @@ class EmotionMovieApp(QWidget):
             genre_list = QListWidget()
             genre_list.setSelectionMode(QListWidget.SelectionMode.MultiSelection)
             genre_list.addItems(self.genre_choices)
+            for genre in self.user_preferences.get(emotion, []):  # Selection saved last time
+                for item in genre_list.findItems(genre, Qt.MatchFlag.MatchExactly):
+                    item.setSelected(True)
             genre_list.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
             group_layout.addWidget(genre_list)
             group_box.setLayout(group_layout)
@@ -67,7 +81,16 @@ class EmotionMovieApp(QWidget):
 
         self.capture_btn = QPushButton("Detect Emotion")
         self.capture_btn.clicked.connect(self.detect_emotion)
+        self.capture_btn.setEnabled(False)  # Until the emotion model and the movies are loaded
         self.setup_layout.addWidget(self.capture_btn)
+        self.startup_bar = QProgressBar()
+        self.setup_layout.addWidget(self.startup_bar)
+        self.live_mode_box = QCheckBox("Live mood: keep watching and update recommendations (press again to stop)")
+        self.setup_layout.addWidget(self.live_mode_box)
+
+        # Live camera feed with the detected face box, drawn inside the window
+        self.camera_preview = CameraPreview()
+        self.setup_layout.addWidget(self.camera_preview)
 
         self.result_label = QLabel("")
         self.setup_layout.addWidget(self.result_label)
@@ -77,36 +100,68 @@ class EmotionMovieApp(QWidget):
         self.recommend_page = QWidget()
         self.recommend_layout = QVBoxLayout(self.recommend_page)
 
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.movie_grid_container = QWidget()
-        self.movie_grid = QGridLayout(self.movie_grid_container)
-
-        self.scroll_area.setWidget(self.movie_grid_container)
+        # The list view scrolls, lays out columns for the window width and only paints visible tiles
+        self.movie_view = make_movie_view(self.movie_model)
         self.recommend_layout.addWidget(QLabel("Recommended Movies:"))
-        self.recommend_layout.addWidget(self.scroll_area)
+        self.recommend_layout.addWidget(self.movie_view)
 
         self.page_stack.addWidget(self.recommend_page)
 
         self.setLayout(layout)
 
+    def start_loading(self):
+        self.preloader = QtPreloader([('movies', load_movies), ('emotion model', load_emotion_model)], self)
+        self.preloader.progress.connect(self.on_loading_progress)
+        self.preloader.failed.connect(self.on_loading_failed)
+        self.preloader.start()
+
+    def on_loading_progress(self, step, done, total):
+        self.startup_bar.setRange(0, total)
+        self.startup_bar.setValue(done)
+        if step:
+            self.startup_bar.setFormat(f"Loading {step}... %p%")
+            return
+        self.movies = self.preloader.result('movies')
+        self.emo_model = self.preloader.result('emotion model')
+        self.startup_bar.hide()
+        self.capture_btn.setEnabled(self.movies is not None and self.emo_model is not None)
+
+    def on_loading_failed(self, step, message):
+        self.result_label.setText(f"Could not load the {step}: {message}")
+
     def detect_emotion(self):
         self.save_preferences()  # Save selected genres before detecting emotion
-        self.thread = EmotionDetectionThread(self.emo_detector)
-        self.thread.emotion_detected.connect(self.on_emotion_detected)
-        self.thread.start()
+        if self.capture_thread is not None and self.capture_thread.isRunning():
+            if isinstance(self.capture_thread, LiveMoodThread):
+                self.capture_thread.stop_thread()  # Second press ends live mode
+            return  # Already capturing
+        if self.live_mode_box.isChecked():
+            self.capture_thread = LiveMoodThread(self.emo_model, preview_fps=self.screen().refreshRate())
+            self.capture_thread.mood_changed.connect(self.on_mood_changed)
+        else:
+            self.capture_thread = EmotionDetectionThread(self.emo_model, preview_fps=self.screen().refreshRate())
+            self.capture_thread.emotion_detected.connect(self.on_emotion_detected)
+        self.capture_thread.frame_ready.connect(self.camera_preview.show_frame)
+        self.capture_thread.start()
 
     def save_preferences(self):
         """Store selected genres for each emotion."""
         for emotion in self.emotions:
             selected_genres = [item.text() for item in self.genre_lists[emotion].selectedItems()]
             self.user_preferences[emotion] = selected_genres
+        self.history.save_preferences(self.user_preferences)
 
     def on_emotion_detected(self, emotion_name):
+        self.history.record_detection(emotion_name)
         self.result_label.setText(f"Detected Emotion: {emotion_name.capitalize()}")
         self.show_recommendations(emotion_name)
 
-    def show_recommendations(self, emotion_name):
+    def on_mood_changed(self, emotion_name):
+        self.history.record_detection(emotion_name)
+        self.result_label.setText(f"Live Mood: {emotion_name.capitalize()}")
+        self.show_recommendations(emotion_name, incremental=True)
+
+    def show_recommendations(self, emotion_name, incremental=False):
         # Default genres if the user didn't select any
         default_emo_genres_map = {
             'angry': ['Action', 'Thriller', 'Crime'],
@@ -122,97 +177,38 @@ class EmotionMovieApp(QWidget):
         if not selected_genres:
             selected_genres = default_emo_genres_map.get(emotion_name, ['Drama'])
 
-        filtered_movies = self.movies[self.movies['Genre'].apply(lambda x: any(genre in x for genre in selected_genres))]
-
-        # Clear previous recommendations
-        for i in reversed(range(self.movie_grid.count())):
-            self.movie_grid.itemAt(i).widget().setParent(None)
-
-        # Adjust grid layout based on screen size
-        screen_width = self.frameGeometry().width()
-        columns = 4 if screen_width > 1000 else 3  # Number of columns based on window width
-        row = 0
-        column = 0
-
-        for i in range(min(16, len(filtered_movies))):
-            title = filtered_movies['Title'].iloc[i]
-            poster_url = filtered_movies['Poster'].iloc[i]
-
-            movie_label = QLabel(title)
-            movie_img = QLabel()
-
-            if not poster_url or not poster_url.startswith("http"):
-                poster_url = "default_poster.jpg"
-
-            request = QNetworkRequest(QUrl(poster_url))
-            reply = self.network_manager.get(request)
-            reply.finished.connect(lambda r=reply, img_label=movie_img: self.load_image(r, img_label))
-
-            # Add widgets to grid layout dynamically based on window size
-            self.movie_grid.addWidget(movie_label, row, column * 2)
-            self.movie_grid.addWidget(movie_img, row, column * 2 + 1)
-
-            column += 1
-            if column >= columns:
-                column = 0
-                row += 1
+        from catalog import unseen_first  # Brings pandas, already imported by the catalog load
+        with timed('filter'):
+            filtered_movies = self.movies[self.movies['Genre'].apply(lambda x: any(genre in x for genre in selected_genres))]
+            filtered_movies = unseen_first(filtered_movies, self.history.recent_titles())  # Shown lately go last
+        self.current_emotion = emotion_name
+
+        # Every match goes to the model, the view only builds and fetches what is on screen
+        if incremental and self.movie_model.rowCount():
+            # Live mood changes only swap the tiles that are no longer recommended
+            with timed('render', mode='incremental'):
+                self.movie_model.update_movies(filtered_movies['Title'].to_numpy(), filtered_movies['Poster'].to_numpy())
+            return
+        with timed('render'):
+            self.movie_model.set_movies(filtered_movies['Title'].to_numpy(), filtered_movies['Poster'].to_numpy())
+        self.movie_view.scrollToTop()
 
         self.page_stack.setCurrentIndex(1)
 
-    def load_image(self, reply, img_label):
-        if reply.error() != QNetworkReply.NetworkError.NoError:
-            img_label.setPixmap(QPixmap("default_poster.jpg").scaled(150, 200, Qt.AspectRatioMode.KeepAspectRatio))
-        else:
-            pixmap = QPixmap()
-            if pixmap.loadFromData(reply.readAll()):
-                img_label.setPixmap(pixmap.scaled(150, 200, Qt.AspectRatioMode.KeepAspectRatio))
-            else:
-                img_label.setPixmap(QPixmap("default_poster.jpg").scaled(150, 200, Qt.AspectRatioMode.KeepAspectRatio))
+    def on_movie_shown(self, title):
+        self.history.record_impressions([title], emotion=self.current_emotion)
 
     def closeEvent(self, event):
-        if hasattr(self, 'thread') and self.thread.isRunning():
-            self.thread.stop_thread()
+        if self.capture_thread is not None and self.capture_thread.isRunning():
+            self.capture_thread.stop_thread()
         event.accept()
 
 
-class EmotionDetectionThread(QThread):
-    emotion_detected = pyqtSignal(str)
-
-    def __init__(self, emo_detector):
-        super().__init__()
-        self.emo_detector = emo_detector
-        self.running = True
-
-    def run(self):
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            self.emotion_detected.emit('neutral')
-            return
-
-        emotion_name = 'neutral'
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            cv2.imshow("Detecting Emotion...", frame)
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
-            emotions = self.emo_detector.detect_emotions(frame)
-            if emotions:
-                emotion_name, _ = self.emo_detector.top_emotion(frame)
-                break
-
-        cap.release()
-        cv2.destroyAllWindows()
-        self.emotion_detected.emit(emotion_name)
-
-    def stop_thread(self):
-        self.running = False
-        self.quit()
-
-
 if __name__ == "__main__":
+    if profiling.requested():
+        profiling.start()  # Report written when the window closes
     app = QApplication(sys.argv)
     window = EmotionMovieApp()
     window.show()
+    report_first_paint(window, app)
     sys.exit(app.exec())
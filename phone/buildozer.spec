@@ -10,7 +10,9 @@ package.name = EmoApp
 package.domain = org.test
 
 # (str) Source code where the main.py live
-source.dir = .
+# The repository root: the app imports the modules it shares with the desktop apps,
+# main.py there starts movie1.py
+source.dir = ..
 
 # (list) Source files to include (let empty to include all the files)
 source.include_exts = 
@@ -22,11 +24,12 @@ source.include_exts =
 #source.exclude_exts = spec
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-#source.exclude_dirs = tests, bin, venv
+source.exclude_dirs = tests, phone/bin, profiles, venv
 
 # (list) List of exclusions using pattern matching
 # Do not prefix with './'
-#source.exclude_patterns = license,images/*/*.jpg
+# The desktop apps, the server and the dev tools, nothing on the phone imports them
+source.exclude_patterns = app.py,app1.py,app2.py,movie.py,movie2.py,movie3.py,qt_*.py,mood.py,service.py,recommendation_cache.py,benchmark.py,load_test.py,warm_posters.py,*.ipynb,*.csv.pkl,*.patch,*.jsonl,*.md,phone/*.spec,phone/default_poster.jpg,phone/icon.ico
 
 # (str) Application versioning (method 1)
 version = 0.1
@@ -37,7 +40,7 @@ version = 0.1
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy,requests,pandas,opencv-python,fer
+requirements = python3,kivy,kivymd,requests,pandas,opencv-python,fer,sqlite3
 
 # (str) Custom source folders for requirements
 # Sets custom source for any requirements with recipes
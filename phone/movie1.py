@@ -1,9 +1,8 @@
 import os
-import shutil
-import requests
-import pandas as pd
+import sys
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import cv2  # Ensure cv2 is imported
-from fer import FER
 from kivy.lang import Builder
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivymd.app import MDApp
@@ -14,24 +13,44 @@ from kivymd.uix.scrollview import ScrollView
 from kivy.metrics import dp
 from kivy.uix.image import Image
 from kivy.resources import resource_find
-from urllib.parse import urlparse
 from kivy.core.window import Window
+from kivy.clock import Clock
+from kivy.properties import BooleanProperty, StringProperty
+# Shared helpers live in the repository root, the APK ships them there too (see buildozer.spec)
+# and starts this file from main.py; `python phone/movie1.py` needs the root put on the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from posters import fetch_poster
+from poster_cache import PosterCache, set_poster_cache
+from dead_posters import DeadPosterCache, get_dead_posters, set_dead_posters
+from thumbnails import THUMB_SIZES
+from prefetch import get_prefetcher
+from emotion import top_emotion
+from history import HistoryStore, get_history, set_history
+from metrics import timed
+import profiling
+from startup import Preloader, load_emotion_model, load_movies, first_paint
 # Default genres for each emotion
 default_emo_genres_map = {
-    'anger': ['Action', 'Thriller', 'Crime'],
+    'angry': ['Action', 'Thriller', 'Crime'],
     'disgust': ['Horror', 'Drama', 'Crime'],
     'fear': ['Thriller', 'Horror', 'Mystery'],
-    'happiness': ['Comedy', 'Romance', 'Animation'],
-    'sadness': ['Drama', 'Romance', 'Biography'],
+    'happy': ['Comedy', 'Romance', 'Animation'],
+    'sad': ['Drama', 'Romance', 'Biography'],
     'surprise': ['Sci-Fi', 'Adventure', 'Fantasy'],
     'neutral': ['Documentary', 'Drama', 'Biography']
 }
 #hello hi 123
-# Load Movie Dataset
-try:
-    movies = pd.read_csv("cleanest_movie.csv")
-except FileNotFoundError:
-    movies = pd.DataFrame(columns=["Title", "Genre", "Poster"])  # Empty dataset fallback
+PAGE_SIZE = 4  # Movies per results page
+MAX_PAGES = 10  # Pages picked per detected emotion, the ones after the current page are prefetched
+POSTER_WORKERS = 4  # Background threads downloading the posters of the current page
+
+def load_phone_movies():
+    """Load Movie Dataset, on the preload thread like the emotion model."""
+    try:
+        return load_movies()
+    except FileNotFoundError:
+        import pandas as pd
+        return pd.DataFrame(columns=["Title", "Genre", "Poster"])  # Empty dataset fallback
 
 # Kivy UI (KV Language)
 KV = '''
@@ -50,9 +69,15 @@ ScreenManager:
             text: "Emotion-Based Movie Recommendation"
             font_style: "H5"
             halign: "center"
+        MDLabel:
+            text: app.startup_status
+            halign: "center"
+            size_hint_y: None
+            height: dp(30)
         MDRaisedButton:
             text: "Detect Emotion"
             pos_hint: {"center_x": 0.5}
+            disabled: not app.startup_done
             on_release: app.root.current = "camera"
 
 <CameraScreen>:
@@ -85,6 +110,10 @@ ScreenManager:
                 spacing: dp(10)
                 size_hint_y: None
                 height: self.minimum_height
+        MDRaisedButton:
+            text: "More Movies"
+            pos_hint: {"center_x": 0.5}
+            on_release: app.next_page()
         MDRaisedButton:
             text: "Back to Menu"
             pos_hint: {"center_x": 0.5}
@@ -101,13 +130,51 @@ class ResultsScreen(Screen):
     pass
 
 class EmotionApp(MDApp):
+    startup_status = StringProperty("Loading...")
+    startup_done = BooleanProperty(False)  # Detect Emotion stays disabled until the model and movies are in
+
     def build(self):
         Window.set_icon('icon.ico')
+        # The emotion model takes seconds to import and build, the menu shows while it loads
+        self.movies = None
+        self.emo_model = None
+        self.preloader = Preloader([('movies', load_phone_movies), ('emotion model', load_emotion_model)],
+                                   on_progress=lambda step, done, total: Clock.schedule_once(
+                                       lambda dt: self.on_loading_progress(step, done, total)),
+                                   on_error=lambda step, error: Clock.schedule_once(
+                                       lambda dt: self.on_loading_failed(step, error))).start()
+        Window.bind(on_flip=self.on_first_flip)
+        # Keep downloaded posters across launches in the app's private storage
+        set_poster_cache(PosterCache(os.path.join(self.user_data_dir, "posters")))
+        set_dead_posters(DeadPosterCache(os.path.join(self.user_data_dir, "dead_posters.json")))
+        set_history(HistoryStore(os.path.join(self.user_data_dir, "history.db")))
+        # Posters are downloaded off the UI thread and swapped into their tiles when ready
+        self.poster_pool = ThreadPoolExecutor(max_workers=POSTER_WORKERS, thread_name_prefix="poster-load")
+        self.poster_futures = []
+        self.page_generation = 0
         return Builder.load_string(KV)
 
+    def on_first_flip(self, window):
+        window.unbind(on_flip=self.on_first_flip)
+        Clock.schedule_once(lambda dt: first_paint(self.stop))  # Tells benchmark.py when the menu is on screen
+
+    def on_loading_progress(self, step, done, total):
+        if step:
+            self.startup_status = f"Loading {step}... ({done}/{total})"
+            return
+        self.movies = self.preloader.results.get('movies')
+        self.emo_model = self.preloader.results.get('emotion model')
+        self.startup_done = self.movies is not None and self.emo_model is not None
+        if self.startup_done:
+            self.startup_status = ""
+
+    def on_loading_failed(self, step, error):
+        self.startup_status = f"Could not load the {step}: {error}"
+
     def detect_emotion(self):
-        cap = cv2.VideoCapture(0)
-        emo_detector = FER(mtcnn=True)
+        with timed('camera_open'):
+            cap = cv2.VideoCapture(0)
+        emo_model = self.emo_model
         
         ret, frame = cap.read()
         if not ret:
@@ -115,19 +182,21 @@ class EmotionApp(MDApp):
             return
         
         emotion_name = "neutral"
-        emotions = emo_detector.detect_emotions(frame)
+        emotions = emo_model.detect(frame)
         if emotions:
-            emotion_name, _ = emo_detector.top_emotion(frame)
+            emotion_name = top_emotion(emotions)  # From the same detection, not a second inference
+        get_history().record_detection(emotion_name, emotions[0]['emotions'] if emotions else None)
+        self.emotion_name = emotion_name
 
         cap.release()
 
-        # Set genres based on emotion
+        # Set genres based on emotion, keyed by the labels the emotion model detects
         emo_genres_map = {
-            'anger': ['Action', 'Thriller', 'Crime'],
+            'angry': ['Action', 'Thriller', 'Crime'],
             'disgust': ['Horror', 'Drama', 'Crime'],
             'fear': ['Thriller', 'Horror', 'Mystery'],
-            'happiness': ['Comedy', 'Romance', 'Animation'],
-            'sadness': ['Drama', 'Romance', 'Biography'],
+            'happy': ['Comedy', 'Romance', 'Animation'],
+            'sad': ['Drama', 'Romance', 'Biography'],
             'surprise': ['Sci-Fi', 'Adventure', 'Fantasy'],
             'neutral': ['Documentary', 'Drama', 'Biography']
         }
@@ -141,81 +210,81 @@ class EmotionApp(MDApp):
         self.root.current = "results"
 
     def recommend_movies(self, genres):
-        filtered = movies[movies['Genre'].str.contains("|".join(genres), case=False, na=False)]
-        filtered = filtered.sample(n=min(4, len(filtered)))  # Limit to 4 movies
+        from catalog import sample_movies  # Brings pandas, already imported by the catalog load
+        movies = self.movies
+        with timed('filter'):
+            filtered = movies[movies['Genre'].str.contains("|".join(genres), case=False, na=False)]
+        # Pick several pages up front so the posters of the next ones can be prefetched
+        with timed('sample'):
+            self.recommendations = sample_movies(filtered, PAGE_SIZE * MAX_PAGES, dead_posters=get_dead_posters(),
+                                                 skip_titles=get_history().recent_titles())
+        self.rec_page = 0
+        self.show_page()
+
+    def next_page(self):
+        """Show the next page of recommendations, wrapping around after the last one."""
+        if (self.rec_page + 1) * PAGE_SIZE >= len(self.recommendations):
+            self.rec_page = 0
+        else:
+            self.rec_page += 1
+        self.show_page()
+
+    def show_page(self):
+        page_start = self.rec_page * PAGE_SIZE
+        filtered = self.recommendations.iloc[page_start:page_start + PAGE_SIZE]
 
         movie_grid = self.root.get_screen("results").ids.movie_grid
         movie_grid.clear_widgets()
 
-        temp_image_paths = []
-
-        for _, movie in filtered.iterrows():
-            title = movie["Title"]
-            poster_url = movie["Poster"]
-            print(f"Checking poster URL: {poster_url}")  # Debugging: log the poster URL
-
-            # Validate poster URL and download if valid
-            if not poster_url or not self.is_valid_image(poster_url):
-                print(f"Using default poster due to invalid URL: {poster_url}")  # Debugging: log fallback
-                poster_url = resource_find('default_poster.jpg')  # Use the default image bundled with the APK
-            else:
-                # Download image and save it locally
-                poster_url = self.download_image(poster_url)
-
-            movie_item = GridLayout(cols=1, spacing=dp(10), size_hint_y=None)
-            movie_item.height = dp(300)  # Adjusted height for bigger images
-
-            movie_item.add_widget(Image(source=poster_url, size_hint_y=0.8))  # Display image above title
-            movie_item.add_widget(MDLabel(text=title, halign="center", size_hint_y=None, height=dp(40)))
-
-            movie_grid.add_widget(movie_item)
-
-            # Add the image path to temp_image_paths for future deletion
-            temp_image_paths.append(poster_url)
-
-        self.temp_image_paths = temp_image_paths  # Store paths to delete later
-
-    def is_valid_image(self, url):
-        """Check if the image URL is valid and accessible."""
-        try:
-            response = requests.get(url, stream=True, timeout=5)
-            if response.status_code == 200:
-                return True
-            else:
-                return False
-        except requests.RequestException as e:
-            print(f"Error checking image URL: {e}")
-            return False
-
-    def download_image(self, url):
-        """Download image and return the local file path."""
-        filename = os.path.join(self.get_temp_image_dir(), os.path.basename(urlparse(url).path))
-        
-        # Check if the file already exists
-        if not os.path.exists(filename):
-            try:
-                response = requests.get(url, stream=True)
-                with open(filename, 'wb') as f:
-                    shutil.copyfileobj(response.raw, f)
-            except requests.RequestException as e:
-                print(f"Error downloading image: {e}")
-        
-        return filename
+        get_history().record_impressions(filtered["Title"].tolist(), emotion=self.emotion_name)
+        # This page is fetched right below, warm the following ones in the background
+        prefetcher = get_prefetcher()
+        prefetcher.record_use(filtered["Poster"].tolist(), size=THUMB_SIZES['phone'])
+        prefetcher.prefetch_pages(self.recommendations["Poster"].tolist(), self.rec_page + 1,
+                                  size=THUMB_SIZES['phone'], page_size=PAGE_SIZE)
+
+        # Tiles show the default poster right away, stale downloads from the previous page are dropped
+        for future in self.poster_futures:
+            future.cancel()
+        self.poster_futures = []
+        self.page_generation += 1
+        default_poster = resource_find('default_poster.jpg')  # Use the default image bundled with the APK
+
+        with timed('render'):
+            for _, movie in filtered.iterrows():
+                title = movie["Title"]
+
+                movie_item = GridLayout(cols=1, spacing=dp(10), size_hint_y=None)
+                movie_item.height = dp(300)  # Adjusted height for bigger images
 
-    def get_temp_image_dir(self):
-        """Ensure temporary image directory exists."""
-        temp_dir = os.path.join(self.get_application_name(), "temp_images")
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        return temp_dir
+                poster_image = Image(source=default_poster, size_hint_y=0.8)
+                movie_item.add_widget(poster_image)  # Display image above title
+                movie_item.add_widget(MDLabel(text=title, halign="center", size_hint_y=None, height=dp(40)))
+
+                movie_grid.add_widget(movie_item)
+
+                future = self.poster_pool.submit(fetch_poster, movie["Poster"], THUMB_SIZES['phone'])
+                future.add_done_callback(partial(self.on_poster_fetched, self.page_generation, poster_image))
+                self.poster_futures.append(future)
+
+    def on_poster_fetched(self, generation, poster_image, future):
+        """Runs on a worker thread, hands the downloaded poster to the UI thread."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        poster_path = future.result()
+        if poster_path:
+            Clock.schedule_once(lambda dt: self.swap_poster(generation, poster_image, poster_path))
+
+    def swap_poster(self, generation, poster_image, poster_path):
+        if generation == self.page_generation:  # Ignore posters of a page that is no longer shown
+            poster_image.source = poster_path
 
     def on_stop(self):
-        """Override the on_stop method to delete temporary images when the app closes."""
-        for temp_image in self.temp_image_paths:
-            # Only delete images that are not the default image
-            if temp_image != resource_find('default_poster.jpg') and os.path.exists(temp_image):
-                os.remove(temp_image)
-                print(f"Deleted temporary image: {temp_image}")
+        self.poster_pool.shutdown(wait=False, cancel_futures=True)
+        get_dead_posters().save()
+
 
 if __name__ == "__main__":
+    if profiling.requested():
+        profiling.start()  # Before Kivy parses the arguments, the report is written at exit
     EmotionApp().run()
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlparse
+import requests
+from metrics import count, timed
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_DIR = os.environ.get(
+    "EMOREC_POSTER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "emorec", "posters"))
+MAX_CACHE_BYTES = int(os.environ.get("EMOREC_POSTER_CACHE_BYTES", 256 * 1024 * 1024))
+MAX_AGE = 30 * 24 * 3600  # Revalidate posters (If-None-Match) once they are a month old
+GONE_STATUSES = (404, 410)  # Answers after which a stale copy is no longer shown, other failures keep it
+STALE_TMP_AGE = 3600  # Leftover temp files from crashed writers are removed after an hour
+FETCH_TIMEOUT = 10
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def atomic_write(path, data):
+    """Write to a temp file in the same directory and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FileLock:
+    """Exclusive lock shared by every process using the same cache directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class PosterCache:
+    """Content-addressed on-disk poster cache with LRU eviction by total size.
+
+    Each poster is stored under the SHA-256 of its URL with a JSON sidecar holding
+    the URL, ETag and fetch time. The data file's mtime records its last use.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes = None  # Lazily measured, corrected on every eviction pass
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url):
+        key = self.key(url)
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if ext not in IMAGE_EXTS:
+            ext = ".jpg"  # Kivy picks its image loader from the extension
+        subdir = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(subdir, key + ext), os.path.join(subdir, key + ".json")
+
+    def get(self, url):
+        """Return the cached file path for the URL (marking it as recently used) or None."""
+        data_path, _ = self._paths(url)
+        try:
+            os.utime(data_path)
+        except OSError:
+            return None
+        return data_path
+
+    def get_meta(self, url):
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, data, etag=None, content_type=None):
+        """Store poster bytes atomically and return the cached file path."""
+        data_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        atomic_write(data_path, data)
+        meta = {"url": url, "etag": etag, "content_type": content_type,
+                "fetched_at": time.time(), "size": len(data)}
+        atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += len(data)
+            over_limit = self._approx_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+        return data_path
+
+    def fetch(self, url, session=None, timeout=FETCH_TIMEOUT, on_error=None):
+        """Return a local path for the poster, downloading or revalidating it when needed.
+
+        Returns None when the poster cannot be fetched; on_error(url, kind) is told why.
+        """
+        path = self.get(url)
+        meta = self.get_meta(url) if path else None
+        if path and meta and time.time() - meta.get("fetched_at", 0) < MAX_AGE:
+            count('poster_cache', result='hit')
+            return path
+        headers = {}
+        if path and meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        session = session or requests
+        try:
+            with timed('poster_http'):
+                response = session.get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            if path is None and on_error is not None:
+                on_error(url, 'timeout' if isinstance(e, requests.Timeout) else 'connection')
+            return path  # A stale copy beats no poster at all
+        if response.status_code == 304 and path:
+            count('poster_cache', result='revalidated')
+            meta["fetched_at"] = time.time()
+            atomic_write(self._paths(url)[1], json.dumps(meta).encode("utf-8"))
+            return path
+        if response.status_code != 200 or not response.content:
+            if path and response.status_code not in GONE_STATUSES:
+                return path  # A server hiccup, keep showing the stale copy
+            if on_error is not None:
+                on_error(url, str(response.status_code) if response.status_code != 200 else 'empty')
+            return None
+        count('poster_cache', result='miss')
+        return self.put(url, response.content, etag=response.headers.get("ETag"),
+                        content_type=response.headers.get("Content-Type"))
+
+    def _entries(self):
+        """Yield (path, size, last_used) for every cached poster and clear stale temp files."""
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed by another process meanwhile
+                if name.startswith(".tmp-"):
+                    if now - stat.st_mtime > STALE_TMP_AGE:
+                        self._remove(path)
+                    continue
+                if name.endswith(".json") or name == ".lock":
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Delete least recently used posters until the cache fits in max_bytes."""
+        with FileLock(os.path.join(self.cache_dir, ".lock")):
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                self._remove(os.path.splitext(path)[0] + ".json")
+                total -= size
+        with self._lock:
+            self._approx_bytes = total
+        return total
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_poster_cache():
+    """Return the process-wide poster cache shared by every frontend."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PosterCache()
+        return _default_cache
+
+
+def set_poster_cache(cache):
+    """Replace the process-wide cache, e.g. to keep it in the app's private data dir on Android."""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from poster_cache import get_poster_cache
+from dead_posters import get_dead_posters
+from thumbnails import cached_thumbnail, thumbnail_key
+from metrics import count, timed
+
+DEFAULT_POSTER = "default_poster.jpg"
+MAX_WORKERS = 8  # Concurrent poster downloads (and pooled keep-alive connections)
+CHECK_TIMEOUT = 3  # Seconds allowed for a single poster request
+GRID_DEADLINE = 6  # Seconds allowed for fetching a whole recommendation grid
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared keep-alive session used for every poster request."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="poster-fetch")
+        return _executor
+
+
+def is_poster_url(url):
+    """Only absolute http(s) URLs are worth a network round trip."""
+    return isinstance(url, str) and url.startswith("http")
+
+
+def _run_for_urls(func, urls, deadline, default):
+    """Run func(url) for each distinct poster URL on the shared pool, returns {url: result}.
+
+    Anything still unresolved when the deadline for the whole grid expires gets the default.
+    """
+    results = {}
+    futures = {}
+    seen = set()
+    for url in urls:
+        if url in seen:
+            continue
+        seen.add(url)
+        if is_poster_url(url):
+            futures[_get_executor().submit(func, url)] = url
+        else:
+            results[url] = default
+    done, not_done = wait(futures, timeout=deadline)
+    for future in done:
+        results[futures[future]] = future.result()
+    for future in not_done:
+        future.cancel()  # Requests already on the wire finish in the background
+        results[futures[future]] = default
+    return results
+
+
+def fetch_poster(url, size=None, timeout=CHECK_TIMEOUT):
+    """Return a local path for one poster (its thumbnail when size is given) or None.
+
+    Known-dead posters are answered from the negative cache without any network I/O.
+    """
+    if not is_poster_url(url):
+        return None
+    cache = get_poster_cache()
+    dead = get_dead_posters()
+    if size is not None:
+        thumb = cache.get(thumbnail_key(url, size))
+        if thumb is not None:
+            count('poster_cache', result='thumbnail_hit')
+            return thumb
+    if dead.is_dead(url) and cache.get(url) is None:
+        return None
+    path = cache.fetch(url, get_session(), timeout, on_error=dead.record_failure)
+    if path is None:
+        return None
+    dead.record_success(url)
+    if size is not None:
+        with timed('thumbnail'):
+            return cached_thumbnail(cache, url, size, source_path=path)
+    return path
+
+
+def fetch_posters(urls, deadline=GRID_DEADLINE, timeout=CHECK_TIMEOUT, size=None):
+    """Download posters concurrently into the shared cache, returns {url: local path or None}.
+
+    With a size, the paths point at pre-scaled thumbnails for that display size.
+    """
+    results = _run_for_urls(lambda url: fetch_poster(url, size, timeout), urls, deadline, None)
+    get_dead_posters().save()
+    return results
+
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from posters import fetch_poster
+from poster_cache import get_poster_cache
+from thumbnails import thumbnail_key
+
+PAGE_SIZE = 16  # Posters per recommendation page
+PREFETCH_PAGES = 2  # Pages warmed beyond the current one
+MAX_WORKERS = 4  # Concurrent prefetch downloads, kept below the foreground poster pool
+MAX_WARMED = 4096  # Warmed posters remembered, the least recently warmed are forgotten first
+
+
+class PosterPrefetcher:
+    """Warm poster thumbnails in the background before the grid asks for them.
+
+    Work is grouped per owner (a Streamlit session, an app window). Starting a new
+    prefetch for an owner cancels whatever is still queued for it, so a changed
+    emotion never waits behind posters nobody will look at.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_warmed=MAX_WARMED):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poster-prefetch")
+        self._lock = threading.Lock()
+        self._generations = {}  # owner -> current generation number
+        self._futures = {}  # owner -> futures of the current generation
+        self.max_warmed = max_warmed
+        self._warmed = OrderedDict()  # (url, size) whose file was put in the poster cache, oldest first
+        self._in_flight = set()
+        self.hits = 0  # Poster was ready when the grid needed it
+        self.late = 0  # Prefetch was still downloading it
+        self.misses = 0  # Never prefetched
+        self.cancelled = 0
+
+    def prefetch(self, urls, size=None, owner=None):
+        """Cancel the owner's previous prefetch and start warming these URLs in order."""
+        with self._lock:
+            generation = self._cancel_locked(owner)
+            futures = []
+            for url in dict.fromkeys(urls):
+                if not isinstance(url, str) or (url, size) in self._warmed or (url, size) in self._in_flight:
+                    continue
+                self._in_flight.add((url, size))
+                futures.append((self._executor.submit(self._warm, owner, generation, url, size), (url, size)))
+            self._futures[owner] = futures
+
+    def prefetch_pages(self, urls, page, size=None, owner=None, page_size=PAGE_SIZE):
+        """Warm the posters of the given page and the PREFETCH_PAGES pages after it."""
+        start = page * page_size
+        self.prefetch(urls[start:start + (PREFETCH_PAGES + 1) * page_size], size, owner)
+
+    def cancel(self, owner=None):
+        with self._lock:
+            self._cancel_locked(owner)
+
+    def _cancel_locked(self, owner):
+        for future, key in self._futures.pop(owner, []):
+            if future.cancel():
+                self._in_flight.discard(key)
+                self.cancelled += 1
+        generation = self._generations.get(owner, 0) + 1
+        self._generations[owner] = generation
+        return generation
+
+    def _warm(self, owner, generation, url, size):
+        try:
+            if self._generations.get(owner) != generation:
+                return  # Superseded while queued
+            if fetch_poster(url, size) is not None:
+                with self._lock:
+                    self._warmed[(url, size)] = None
+                    self._warmed.move_to_end((url, size))
+                    while len(self._warmed) > self.max_warmed:
+                        self._warmed.popitem(last=False)
+        finally:
+            with self._lock:
+                self._in_flight.discard((url, size))
+
+    def record_use(self, urls, size=None):
+        """Count how many of the posters a grid is about to show were prefetched in time.
+
+        A warmed poster only counts as a hit while its file is still in the poster cache.
+        """
+        with self._lock:
+            warmed = []
+            for url in urls:
+                if (url, size) in self._warmed:
+                    warmed.append(url)
+                elif (url, size) in self._in_flight:
+                    self.late += 1
+                else:
+                    self.misses += 1
+        cache = get_poster_cache()
+        evicted = [url for url in warmed if cache.get(url if size is None else thumbnail_key(url, size)) is None]
+        with self._lock:
+            self.hits += len(warmed) - len(evicted)
+            self.misses += len(evicted)
+            for url in evicted:
+                self._warmed.pop((url, size), None)  # Warmed again by the next prefetch
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.late + self.misses
+            return {
+                'hits': self.hits,
+                'late': self.late,
+                'misses': self.misses,
+                'cancelled': self.cancelled,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+_default_prefetcher = None
+_default_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Return the process-wide prefetcher (shared by every Streamlit session)."""
+    global _default_prefetcher
+    with _default_lock:
+        if _default_prefetcher is None:
+            _default_prefetcher = PosterPrefetcher()
+        return _default_prefetcher
@@ -0,0 +1,213 @@
+"""Opt-in CPU and memory profiling of a whole app session.
+
+Enabled with EMOREC_PROFILE=1 or a --profile argument, for example
+
+    EMOREC_PROFILE=1 python movie2.py
+    python phone/movie1.py --profile
+    streamlit run app2.py -- --profile
+
+When the session ends (or after every Streamlit run, which never really exits) a
+report is written to EMOREC_PROFILE_DIR (default ./profiles):
+
+    <app>-<pid>.prof  cProfile data for snakeviz or pstats
+    <app>-<pid>.txt   the profile sorted by cumulative time, the top allocation sites
+                      since the session started and the peak RSS seen in each stage
+"""
+import os
+import io
+import sys
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+import metrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_DIR = os.environ.get("EMOREC_PROFILE_DIR", "profiles")
+TRACE_FRAMES = int(os.environ.get("EMOREC_PROFILE_FRAMES", 5))  # Stack depth kept per allocation
+TOP_FUNCTIONS = 60
+TOP_ALLOCATIONS = 30
+
+
+_flag_seen = False
+
+
+def requested(argv=None):
+    """True when profiling was asked for, a --profile argument is removed so the app never sees it.
+
+    The answer sticks for the process, so a Streamlit script asking again on every rerun
+    keeps profiling after the argument is gone.
+    """
+    global _flag_seen
+    argv = sys.argv if argv is None else argv
+    if "--profile" in argv:
+        argv.remove("--profile")
+        _flag_seen = True
+    return _flag_seen or os.environ.get("EMOREC_PROFILE", "") not in ("", "0")
+
+
+def current_rss():
+    """Resident set size in bytes, the peak so far where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def peak_rss():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def _mb(size):
+    return f"{size / (1024 * 1024):9.1f} MB"
+
+
+class ProfileSession:
+    """cProfile and tracemalloc for one process, plus RSS around every metrics stage.
+
+    cProfile only sees the thread it runs on, so worker threads that matter (the Qt
+    camera thread, a Streamlit script run) wrap their work in thread_profile() and
+    are merged into the report.
+    """
+
+    def __init__(self, app=metrics.APP_NAME, output_dir=PROFILE_DIR):
+        self.app = app
+        self.output_dir = output_dir
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stats = None  # pstats.Stats merged from finished thread profiles
+        self._active = {}  # thread id -> cProfile.Profile still running there
+        self._stages = {}  # stage -> {'calls', 'seconds', 'peak_rss', 'max_growth'}
+        tracemalloc.start(TRACE_FRAMES)
+        self._baseline = tracemalloc.take_snapshot()
+        metrics.add_listener(self)
+
+    def stage_started(self, stage):
+        return current_rss()
+
+    def stage_finished(self, stage, seconds, rss_before):
+        rss = current_rss()
+        with self._lock:
+            entry = self._stages.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'peak_rss': 0, 'max_growth': 0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['peak_rss'] = max(entry['peak_rss'], rss, peak_rss())
+            entry['max_growth'] = max(entry['max_growth'], rss - rss_before)
+
+    def begin_thread(self):
+        """Start profiling the calling thread, a profile it left running is folded in first."""
+        self.end_thread()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return  # Python 3.12+, the profiler already running sees every thread
+        with self._lock:
+            self._active[threading.get_ident()] = profile
+
+    def end_thread(self):
+        """Stop profiling the calling thread and merge what it recorded."""
+        with self._lock:
+            profile = self._active.pop(threading.get_ident(), None)
+        if profile is None:
+            return
+        profile.disable()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def write_report(self):
+        """Write the .prof and .txt report, safe to call repeatedly (each call replaces the last)."""
+        self.end_thread()
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.app}-{os.getpid()}")
+        with self._lock:
+            stats = self._stats
+            stages = {stage: dict(entry) for stage, entry in self._stages.items()}
+        text = io.StringIO()
+        text.write(f"Profile of {self.app} (pid {os.getpid()}), {time.time() - self.started:.1f}s session, "
+                   f"peak RSS {_mb(peak_rss()).strip()}\n\n")
+
+        text.write("Peak RSS per stage\n")
+        text.write(f"{'stage':<18}{'calls':>7}{'seconds':>10}{'peak RSS':>13}{'max growth':>13}\n")
+        for stage, entry in sorted(stages.items(), key=lambda item: -item[1]['peak_rss']):
+            text.write(f"{stage:<18}{entry['calls']:>7}{entry['seconds']:>10.2f}"
+                       f"{_mb(entry['peak_rss']):>13}{_mb(entry['max_growth']):>13}\n")
+
+        current, peak = tracemalloc.get_traced_memory()
+        text.write(f"\nTop allocation sites since the session started "
+                   f"(Python heap now {_mb(current).strip()}, peak {_mb(peak).strip()})\n")
+        # Leave out what the profiler itself allocated
+        own_files = [module.__file__ for module in (tracemalloc, cProfile, pstats, sys.modules[__name__])]
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, path) for path in own_files + ["<frozen importlib._bootstrap>"]])
+        for diff in snapshot.compare_to(self._baseline, "lineno")[:TOP_ALLOCATIONS]:
+            text.write(f"{diff}\n")
+
+        text.write("\nCPU profile, by cumulative time\n")
+        if stats is not None:
+            stats.dump_stats(base + ".prof")
+            stats.stream = text
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        else:
+            text.write("No thread was profiled.\n")
+        tmp_path = base + ".txt.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        os.replace(tmp_path, base + ".txt")
+        return base + ".txt"
+
+
+_session = None
+_lock = threading.Lock()
+
+
+def start(app=None):
+    """Start the process-wide session and profile the calling thread, the report is written at exit."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = ProfileSession(app or metrics.APP_NAME)
+            atexit.register(_session.write_report)
+        session = _session
+    session.begin_thread()
+    return session
+
+
+def get_session():
+    return _session
+
+
+def write_report():
+    """Write the report now, for Streamlit whose script runs end long before the process does."""
+    if _session is not None:
+        return _session.write_report()
+
+
+@contextmanager
+def _profiled_thread(session):
+    session.begin_thread()
+    try:
+        yield
+    finally:
+        session.end_thread()
+
+
+def thread_profile():
+    """Profile the calling thread for the duration of the block when a session is running."""
+    if _session is None:
+        return nullcontext()
+    return _profiled_thread(_session)
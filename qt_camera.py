@@ -0,0 +1,150 @@
+import os
+import time
+import cv2
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtCore import QRectF, QThread, pyqtSignal
+from mood import MoodTracker
+from metrics import timed
+from profiling import thread_profile
+
+BOX_COLOR = (0, 200, 0)  # BGR
+ANALYSIS_RATE = float(os.environ.get("EMOREC_ANALYSIS_RATE", 2.0))  # Live mode emotion analyses per second
+
+
+def draw_faces(frame, faces):
+    """Draw the detected face boxes with their top emotion onto the frame in place."""
+    for face in faces:
+        x, y, w, h = face['box']
+        top_emotion = max(face['emotions'], key=face['emotions'].get)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), BOX_COLOR, 2)
+        cv2.putText(frame, top_emotion, (x, max(0, y - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.7, BOX_COLOR, 2)
+
+
+def frame_to_qimage(frame):
+    """Wrap a BGR frame in a QImage that shares the NumPy buffer instead of copying it.
+
+    The frame must stay referenced for as long as the image is used.
+    """
+    height, width = frame.shape[:2]
+    return QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_BGR888)
+
+
+class EmotionDetectionThread(QThread):
+    emotion_detected = pyqtSignal(str)
+    frame_ready = pyqtSignal(object)  # (QImage, frame), the frame keeps the image buffer alive
+
+    def __init__(self, emo_model, preview_fps=60):
+        super().__init__()
+        self.model = emo_model  # emotion.EmotionModel, loaded once by the app
+        self.running = True
+        self.frame_interval = 1.0 / preview_fps if preview_fps else 0.0
+        self._last_frame_time = 0.0
+
+    def run(self):
+        with thread_profile():  # Inference happens here, not on the thread a profile session started on
+            self._capture()
+
+    def _capture(self):
+        with timed('camera_open'):
+            cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            self.emotion_detected.emit('neutral')
+            return
+
+        emotion_name = 'neutral'
+        while self.running:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            emotions = self.model.detect(frame)
+            if emotions:
+                draw_faces(frame, emotions)
+                # Same pick as top_emotion() without running the detector a second time
+                emotion_name = max(emotions[0]['emotions'], key=emotions[0]['emotions'].get)
+                self.show_frame(frame, force=True)
+                break
+            self.show_frame(frame)
+
+        cap.release()
+        self.emotion_detected.emit(emotion_name)
+
+    def show_frame(self, frame, force=False):
+        """Send the frame to the preview, at most once per display refresh."""
+        now = time.monotonic()
+        if not force and now - self._last_frame_time < self.frame_interval:
+            return
+        self._last_frame_time = now
+        self.frame_ready.emit((frame_to_qimage(frame), frame))
+
+    def stop_thread(self):
+        self.running = False
+        self.quit()
+
+
+class LiveMoodThread(EmotionDetectionThread):
+    """Keeps the camera running and reports the smoothed mood whenever it changes.
+
+    Frames are previewed continuously, but the detector only runs analysis_rate times a
+    second, which is what bounds the CPU spent on live mode.
+    """
+    mood_changed = pyqtSignal(str)
+
+    def __init__(self, emo_model, preview_fps=60, analysis_rate=ANALYSIS_RATE):
+        super().__init__(emo_model, preview_fps)
+        self.analysis_interval = 1.0 / analysis_rate
+        self.tracker = MoodTracker()
+
+    def _capture(self):
+        with timed('camera_open'):
+            cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            self.mood_changed.emit('neutral')
+            return
+
+        last_analysis = 0.0
+        faces = []
+        while self.running:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            now = time.monotonic()
+            if now - last_analysis >= self.analysis_interval:
+                last_analysis = now
+                faces = self.model.detect(frame)
+                if faces and self.tracker.update(faces[0]['emotions']):
+                    self.mood_changed.emit(self.tracker.mood)
+            # The last boxes stay on screen between analyses
+            draw_faces(frame, faces)
+            self.show_frame(frame)
+
+        cap.release()
+
+
+class CameraPreview(QWidget):
+    """Paints the latest camera frame scaled into the widget, keeping its aspect ratio."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._image = None
+        self._frame = None
+        self.setMinimumSize(320, 240)
+
+    def show_frame(self, payload):
+        self._image, self._frame = payload
+        self.update()
+
+    def clear(self):
+        self._image = self._frame = None
+        self.update()
+
+    def paintEvent(self, event):
+        if self._image is None:
+            return
+        scale = min(self.width() / self._image.width(), self.height() / self._image.height())
+        width = self._image.width() * scale
+        height = self._image.height() * scale
+        target = QRectF((self.width() - width) / 2, (self.height() - height) / 2, width, height)
+        painter = QPainter(self)
+        painter.drawImage(target, self._image)
+        painter.end()
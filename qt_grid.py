@@ -0,0 +1,174 @@
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyle
+from PyQt6.QtGui import QColor, QPixmap
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt, pyqtSignal
+from prefetch import get_prefetcher, PAGE_SIZE, PREFETCH_PAGES
+from thumbnails import THUMB_SIZES
+
+TILE_PADDING = 6
+TITLE_HEIGHT = 36  # Two lines of title under the poster
+TITLE_FLAGS = (Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop).value | Qt.TextFlag.TextWordWrap.value
+
+
+class MovieListModel(QAbstractListModel):
+    """Recommended movies for a QListView, posters are only requested for rows the view paints.
+
+    Holds the title and poster columns of the filtered catalog as plain lists, so thousands
+    of matches cost no widgets and only the visible posters are ever decoded.
+    """
+    PosterUrlRole = Qt.ItemDataRole.UserRole + 1
+    movie_shown = pyqtSignal(str)  # Title of a movie the view painted, once per recommendation set
+
+    def __init__(self, poster_loader, parent=None):
+        super().__init__(parent)
+        self.poster_loader = poster_loader
+        self.poster_loader.poster_loaded.connect(self._on_poster_loaded)
+        self._titles = []
+        self._posters = []
+        self._waiting = {}  # poster url -> rows painted before it arrived
+        self._shown = set()
+        self._prefetched_until = 0
+        self._placeholder = QPixmap(*poster_loader.size)
+        self._placeholder.fill(QColor(220, 220, 220))
+
+    def set_movies(self, titles, posters):
+        """Replace the recommendations, aborting poster downloads of the old ones."""
+        self.beginResetModel()
+        self.poster_loader.reset()
+        get_prefetcher().cancel(owner=id(self))
+        self._titles = list(titles)
+        self._posters = list(posters)
+        self._waiting = {}
+        self._shown = set()
+        self._prefetched_until = 0
+        self.endResetModel()
+
+    def update_movies(self, titles, posters):
+        """Switch to new recommendations touching only the tiles that change.
+
+        Movies that are still recommended keep their position (and their loaded poster),
+        the others are replaced in place by new movies, extra ones are appended and rows
+        left without a replacement are removed.
+        """
+        new_movies = list(zip(titles, posters))
+        wanted = set(new_movies)
+        old_movies = list(zip(self._titles, self._posters))
+        kept = {movie for movie in old_movies if movie in wanted}
+        fresh = iter([movie for movie in new_movies if movie not in kept])
+        changed_rows = []
+        holes = []
+        for row, movie in enumerate(old_movies):
+            if movie in kept:
+                continue
+            replacement = next(fresh, None)
+            if replacement is None:
+                holes.append(row)
+            else:
+                self._titles[row], self._posters[row] = replacement
+                changed_rows.append(row)
+        for row in changed_rows:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        # Remove rows nothing could replace, last contiguous range first so indexes stay valid
+        while holes:
+            last = first = holes.pop()
+            while holes and holes[-1] == first - 1:
+                first = holes.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._titles[first:last + 1]
+            del self._posters[first:last + 1]
+            self.endRemoveRows()
+        extra = list(fresh)
+        if extra:
+            start = len(self._titles)
+            self.beginInsertRows(QModelIndex(), start, start + len(extra) - 1)
+            for title, poster in extra:
+                self._titles.append(title)
+                self._posters.append(poster)
+            self.endInsertRows()
+        if self._waiting and self._titles:
+            # Row numbers may have moved, let the visible rows ask for their posters again
+            self._waiting = {}
+            self.dataChanged.emit(self.index(0), self.index(len(self._titles) - 1), [Qt.ItemDataRole.DecorationRole])
+        self._prefetched_until = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._titles)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._titles):
+            return None
+        row = index.row()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return str(self._titles[row])
+        if role == self.PosterUrlRole:
+            return self._posters[row]
+        if role == Qt.ItemDataRole.DecorationRole:
+            url = self._posters[row]
+            title = str(self._titles[row])
+            if title not in self._shown:
+                self._shown.add(title)
+                self.movie_shown.emit(title)
+                if isinstance(url, str):  # Whether the prefetch got to it first, for the hit rate
+                    get_prefetcher().record_use([url], size=self.poster_loader.size)
+            self._prefetch_after(row)
+            pixmap = self.poster_loader.load(url)
+            if pixmap is None:
+                self._waiting.setdefault(url, set()).add(row)
+                return self._placeholder
+            return pixmap
+        return None
+
+    def _prefetch_after(self, row):
+        """Warm the posters a page or two past what has been painted so far."""
+        if row + PAGE_SIZE < self._prefetched_until:
+            return
+        start = max(row + 1, self._prefetched_until)
+        self._prefetched_until = row + 1 + (PREFETCH_PAGES + 1) * PAGE_SIZE
+        urls = [url for url in self._posters[start:self._prefetched_until] if isinstance(url, str)]
+        get_prefetcher().prefetch(urls, size=self.poster_loader.size, owner=id(self))
+
+    def _on_poster_loaded(self, url, pixmap):
+        for row in self._waiting.pop(url, ()):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class PosterDelegate(QStyledItemDelegate):
+    """Paints a poster with its title underneath, every tile has the same size."""
+
+    def __init__(self, size=THUMB_SIZES['qt'], parent=None):
+        super().__init__(parent)
+        self.size = size
+
+    def sizeHint(self, option, index):
+        return QSize(self.size[0] + 2 * TILE_PADDING, self.size[1] + TITLE_HEIGHT + 2 * TILE_PADDING)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        width, height = self.size
+        left = option.rect.x() + TILE_PADDING
+        top = option.rect.y() + TILE_PADDING
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap is not None and not pixmap.isNull():
+            # Thumbnails keep their aspect ratio, center them in the poster slot
+            painter.drawPixmap(left + (width - pixmap.width()) // 2, top + (height - pixmap.height()) // 2, pixmap)
+        title_rect = QRect(left, top + height + 2, width, TITLE_HEIGHT - 2)
+        painter.drawText(title_rect, TITLE_FLAGS, option.fontMetrics.elidedText(index.data(), Qt.TextElideMode.ElideRight, width * 2))
+        painter.restore()
+
+
+def make_movie_view(model, parent=None):
+    """Icon-mode QListView that lays out and paints only what is needed for thousands of movies."""
+    view = QListView(parent)
+    view.setViewMode(QListView.ViewMode.IconMode)
+    view.setResizeMode(QListView.ResizeMode.Adjust)
+    view.setMovement(QListView.Movement.Static)
+    view.setUniformItemSizes(True)
+    view.setLayoutMode(QListView.LayoutMode.Batched)
+    view.setBatchSize(200)
+    view.setSpacing(10)
+    view.setItemDelegate(PosterDelegate(model.poster_loader.size, view))
+    view.setModel(model)
+    return view
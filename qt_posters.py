@@ -0,0 +1,128 @@
+import os
+import time
+from collections import deque
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from PyQt6.QtCore import QObject, QUrl, pyqtSignal, Qt
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkDiskCache, QNetworkRequest, QNetworkReply
+from poster_cache import CACHE_DIR, get_poster_cache
+from dead_posters import get_dead_posters
+from posters import DEFAULT_POSTER, is_poster_url
+from thumbnails import THUMB_SIZES, cached_thumbnail, thumbnail_key
+from metrics import observe
+
+MAX_CONCURRENT = 6  # Poster downloads in flight at once
+TRANSFER_TIMEOUT_MS = 8000
+QT_CACHE_DIR = os.path.join(os.path.dirname(CACHE_DIR), "qt-network")
+QT_CACHE_BYTES = 100 * 1024 * 1024
+PIXMAP_CACHE_KB = 20 * 1024  # Decoded posters kept in memory, about 160 tiles of 150x200
+
+
+class PosterLoader(QObject):
+    """Loads poster thumbnails for the Qt grids through a bounded download queue.
+
+    Posters come from the in-memory QPixmapCache, then the shared thumbnail cache on
+    disk, and only then from the network (backed by a persistent QNetworkDiskCache).
+    poster_loaded(url, pixmap) is emitted for every poster that had to be downloaded.
+    """
+    poster_loaded = pyqtSignal(str, QPixmap)
+
+    def __init__(self, size=THUMB_SIZES['qt'], max_concurrent=MAX_CONCURRENT, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.max_concurrent = max_concurrent
+        self.poster_cache = get_poster_cache()
+        self.dead_posters = get_dead_posters()
+        self.network_manager = QNetworkAccessManager(self)
+        disk_cache = QNetworkDiskCache(self)
+        disk_cache.setCacheDirectory(QT_CACHE_DIR)
+        disk_cache.setMaximumCacheSize(QT_CACHE_BYTES)
+        self.network_manager.setCache(disk_cache)
+        QPixmapCache.setCacheLimit(PIXMAP_CACHE_KB)
+        self._queue = deque()
+        self._queued = set()
+        self._in_flight = {}  # reply -> url
+        self._started = {}  # reply -> perf_counter() when its request was sent
+
+    def default_pixmap(self):
+        pixmap = QPixmapCache.find(DEFAULT_POSTER)
+        if pixmap is None:
+            pixmap = QPixmap(DEFAULT_POSTER).scaled(*self.size, Qt.AspectRatioMode.KeepAspectRatio)
+            QPixmapCache.insert(DEFAULT_POSTER, pixmap)
+        return pixmap
+
+    def load(self, url):
+        """Return the poster if it is available without the network, otherwise queue it and return None."""
+        if not is_poster_url(url):
+            return self.default_pixmap()
+        key = thumbnail_key(url, self.size)
+        pixmap = QPixmapCache.find(key)
+        if pixmap is not None:
+            return pixmap
+        path = self.poster_cache.get(key)
+        if path is not None:
+            pixmap = QPixmap(path)
+            if not pixmap.isNull():
+                QPixmapCache.insert(key, pixmap)
+                return pixmap
+        if self.dead_posters.is_dead(url):
+            return self.default_pixmap()  # Known dead, skip the network entirely
+        if url not in self._queued and url not in self._in_flight.values():
+            self._queue.append(url)
+            self._queued.add(url)
+            self._start_next()
+        return None
+
+    def reset(self):
+        """Drop queued posters and abort in-flight downloads, e.g. when the grid is rebuilt."""
+        self._queue.clear()
+        self._queued.clear()
+        replies = list(self._in_flight)
+        self._in_flight.clear()  # Aborted replies are then ignored by _on_finished
+        self._started.clear()
+        for reply in replies:
+            reply.abort()
+
+    def _start_next(self):
+        while self._queue and len(self._in_flight) < self.max_concurrent:
+            url = self._queue.popleft()
+            self._queued.discard(url)
+            request = QNetworkRequest(QUrl(url))
+            request.setAttribute(QNetworkRequest.Attribute.CacheLoadControlAttribute,
+                                 QNetworkRequest.CacheLoadControl.PreferCache)
+            request.setTransferTimeout(TRANSFER_TIMEOUT_MS)
+            reply = self.network_manager.get(request)
+            self._in_flight[reply] = url
+            self._started[reply] = time.perf_counter()
+            reply.finished.connect(lambda r=reply: self._on_finished(r))
+
+    def _on_finished(self, reply):
+        url = self._in_flight.pop(reply, None)
+        started = self._started.pop(reply, None)
+        reply.deleteLater()
+        if started is not None:
+            observe('poster_http', time.perf_counter() - started)
+        if url is not None:
+            self.poster_loaded.emit(url, self._read_reply(url, reply))
+        self._start_next()
+
+    def _read_reply(self, url, reply):
+        error = reply.error()
+        if error != QNetworkReply.NetworkError.NoError:
+            status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+            if status:
+                kind = str(status)
+            elif error in (QNetworkReply.NetworkError.TimeoutError,
+                           QNetworkReply.NetworkError.OperationCanceledError):
+                kind = 'timeout'  # Replies we abort ourselves never get here
+            else:
+                kind = 'connection'
+            self.dead_posters.record_failure(url, kind)
+            self.dead_posters.save()
+            return self.default_pixmap()
+        # Scale the poster once and keep only the thumbnail, later grids load it directly
+        path = cached_thumbnail(self.poster_cache, url, self.size, data=bytes(reply.readAll()))
+        pixmap = QPixmap(path) if path else QPixmap()
+        if pixmap.isNull():
+            return self.default_pixmap()
+        QPixmapCache.insert(thumbnail_key(url, self.size), pixmap)
+        return pixmap
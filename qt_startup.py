@@ -0,0 +1,39 @@
+from PyQt6.QtCore import QEvent, QObject, QTimer, pyqtSignal
+from startup import Preloader, first_paint, STARTUP_PROBE
+
+
+class QtPreloader(QObject):
+    """startup.Preloader whose progress arrives as signals on the GUI thread."""
+    progress = pyqtSignal(str, int, int)  # Step now loading ('' once all are done), steps done, total
+    failed = pyqtSignal(str, str)  # Step, error message
+
+    def __init__(self, steps, parent=None):
+        super().__init__(parent)
+        # Emitted on the loader thread, Qt queues them over to this object's thread
+        self.loader = Preloader(steps,
+                                on_progress=lambda label, done, total: self.progress.emit(label or '', done, total),
+                                on_error=lambda label, error: self.failed.emit(label, str(error)))
+
+    def start(self):
+        self.loader.start()
+
+    def result(self, label):
+        return self.loader.results.get(label)
+
+
+class _FirstPaintWatcher(QObject):
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, lambda: first_paint(self.app.quit))  # Once this paint is done
+        return False
+
+
+def report_first_paint(window, app):
+    """Tell benchmark.py when the window first paints, nothing is installed otherwise."""
+    if STARTUP_PROBE:
+        window.installEventFilter(_FirstPaintWatcher(app))
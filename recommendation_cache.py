@@ -0,0 +1,141 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from metrics import count
+
+MAX_ENTRIES = int(os.environ.get("EMOREC_REC_CACHE_ENTRIES", 256))  # Distinct genre sets kept
+MAX_BYTES = int(float(os.environ.get("EMOREC_REC_CACHE_MB", 64)) * 1024 * 1024)  # Row positions kept, in total
+TTL = float(os.environ.get("EMOREC_REC_CACHE_TTL", 600))  # Seconds before a result is filtered again
+ENTRY_OVERHEAD = 200  # Bytes counted per entry on top of its positions (key, bookkeeping)
+
+
+def genre_key(genres):
+    """The same key for the same genres however they were typed or ordered."""
+    return tuple(sorted({genre.strip().lower() for genre in genres if genre and genre.strip()}))
+
+
+def _catalog_key(movies):
+    """What identifies this catalog, load_catalog() stamps its version from the CSV's path, size and mtime."""
+    return movies.attrs.get('version') or ('object', id(movies)), len(movies)
+
+
+class RecommendationCache:
+    """Process-wide LRU of genre filter results, shared by every Streamlit session.
+
+    Entries hold the matching row positions rather than the rows, keyed by the catalog
+    version and the normalized genre set. Bounded by entry count and by bytes, entries
+    expire after ttl seconds. Sessions asking for the same genres at the same time wait
+    for one filter rather than each scanning the catalog.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, positions), least recently used first
+        self._in_flight = {}  # key -> Event set once its filter is stored
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def filter(self, movies, genres, match):
+        """The movies match(movies, genres) selects, match returns a boolean mask over movies.
+
+        movies must be the whole catalog as loaded, the cached positions index into it.
+        """
+        key = (_catalog_key(movies), genre_key(genres))
+        while True:
+            with self._lock:
+                positions = self._get_locked(key)
+                if positions is not None:
+                    self.hits += 1
+                    count('recommendation_cache', result='hit')
+                    return movies.iloc[positions]
+                waiting = self._in_flight.get(key)
+                if waiting is None:
+                    done = self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            waiting.wait()  # Another session is filtering these genres, then it is a hit (or our turn)
+        count('recommendation_cache', result='miss')
+        try:
+            positions = np.flatnonzero(np.asarray(match(movies, genres), dtype=bool))
+            positions = positions.astype(np.int32 if len(movies) < 2 ** 31 else np.int64)
+            with self._lock:
+                self._put_locked(key, positions)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            done.set()
+        return movies.iloc[positions]
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, positions = entry
+        if time.monotonic() >= expires_at:
+            self._drop_locked(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return positions
+
+    def _put_locked(self, key, positions):
+        size = positions.nbytes + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return  # Would evict everything else, and is cheap to filter again compared to its size
+        if key in self._entries:
+            self._drop_locked(key)
+        self._entries[key] = (time.monotonic() + self.ttl, positions)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop_locked(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop_locked(self, key):
+        _, positions = self._entries.pop(key)
+        self.bytes -= positions.nbytes + ENTRY_OVERHEAD
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_recommendation_cache():
+    """Return the process-wide cache (shared by every Streamlit session)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RecommendationCache()
+        return _default_cache
+
+
+def set_recommendation_cache(cache):
+    """Replace the process-wide cache, e.g. with other bounds in a benchmark."""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,257 @@
+"""Headless emotion and recommendation service, so several kiosks can share one server.
+
+    python service.py --port 8080 --catalog cleanest_movie.csv
+
+POST /emotion    JPEG body (or multipart field "image"), returns the faces and emotion scores
+POST /recommend  JSON {"emotion": "happy"} or {"emotions": {...}}, optional "preferences"
+                 ({emotion: [genres]}) and "n", returns movies with their poster URLs
+GET  /metrics    stage latency histograms in the Prometheus text format (?format=json for JSON),
+                 collected when EMOREC_METRICS=1
+
+With --stream-catalog the catalog stays on disk and every /recommend reads it through
+in chunks, for catalogs that do not fit in memory.
+
+The emotion model is loaded once. Concurrent /emotion requests are coalesced into
+micro-batches: a batch is sent to the model when it is full or when the oldest
+request has waited --max-wait-ms, whichever comes first.
+"""
+import os
+import sys
+import math
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from catalog import GenreIndex, StreamingCatalog, load_catalog, recommend
+from dead_posters import get_dead_posters
+from emotion import EmotionModel, decode_image, top_emotion
+from inference import configure_threads
+from metrics import get_metrics, timed
+
+MAX_BATCH = int(os.environ.get("EMOREC_MAX_BATCH", 16))  # Frames per model call
+MAX_WAIT_MS = float(os.environ.get("EMOREC_MAX_WAIT_MS", 10))  # How long a request may wait for company
+MAX_PENDING = 256  # Queued frames before new requests are turned away
+MAX_RECOMMENDATIONS = 100
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+
+
+class MicroBatcher:
+    """Queues frames from concurrent requests and runs them through predict() together.
+
+    predict(frames) -> one result per frame, and always runs on the same worker thread
+    so the model is never used from two threads at once.
+    """
+
+    def __init__(self, predict, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000.0, max_pending=MAX_PENDING):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self._pending = deque()  # (frame, future)
+        self._arrived = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+        self.batches = 0
+        self.frames = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, frame):
+        """Wait for the frame's prediction, returns (result, size of the batch it ran in)."""
+        if len(self._pending) >= self.max_pending:
+            raise web.HTTPServiceUnavailable(text="Emotion model is overloaded, try again later")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((frame, future))
+        self._arrived.set()
+        return await future
+
+    def stats(self):
+        mean = self.frames / self.batches if self.batches else 0.0
+        return {'batches': self.batches, 'frames': self.frames, 'mean_batch_size': mean,
+                'pending': len(self._pending)}
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        while not self._pending:
+            self._arrived.clear()
+            await self._arrived.wait()
+        deadline = loop.time() + self.max_wait
+        while len(self._pending) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        count = min(self.max_batch, len(self._pending))
+        return [self._pending.popleft() for _ in range(count)]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Clients that went away while queued do not cost a model slot
+            batch = [(frame, future) for frame, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict, [frame for frame, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result((result, len(batch)))
+
+
+async def read_image(request):
+    """Image bytes from a raw body or from the "image" field of a multipart form."""
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "image":
+                return await part.read()
+        raise web.HTTPBadRequest(text='Multipart upload has no "image" field')
+    return await request.read()
+
+
+async def handle_emotion(request):
+    data = await read_image(request)
+    if not data:
+        raise web.HTTPBadRequest(text="Empty upload")
+    with timed('decode'):
+        frame = await asyncio.to_thread(decode_image, data)
+    if frame is None:
+        raise web.HTTPBadRequest(text="Upload is not a JPEG or PNG image")
+    faces, batch_size = await request.app['batcher'].submit(frame)
+    return web.json_response({'emotion': top_emotion(faces), 'faces': faces, 'batch_size': batch_size})
+
+
+def parse_distribution(body):
+    """{emotion: probability} from a recommend request, a single emotion counts as certain."""
+    if 'emotions' in body:
+        distribution = body['emotions']
+        if not isinstance(distribution, dict) or not distribution:
+            raise web.HTTPBadRequest(text='"emotions" must be a non-empty {emotion: probability} object')
+        try:
+            distribution = {str(name): float(p) for name, p in distribution.items()}
+        except (TypeError, ValueError):
+            raise web.HTTPBadRequest(text='"emotions" probabilities must be numbers')
+        if not all(math.isfinite(p) for p in distribution.values()):
+            raise web.HTTPBadRequest(text='"emotions" probabilities must be finite')
+        return distribution
+    if isinstance(body.get('emotion'), str):
+        return {body['emotion']: 1.0}
+    raise web.HTTPBadRequest(text='Request needs an "emotion" or an "emotions" distribution')
+
+
+def parse_preferences(body):
+    """{emotion: [genres]} from a recommend request, empty when it has none."""
+    preferences = body.get('preferences') or {}
+    if not isinstance(preferences, dict) or not all(
+            isinstance(genres, list) and all(isinstance(genre, str) for genre in genres)
+            for genres in preferences.values()):
+        raise web.HTTPBadRequest(text='"preferences" must be an {emotion: [genres]} object')
+    return preferences
+
+
+async def handle_recommend(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Body must be a JSON object")
+    distribution = parse_distribution(body)
+    preferences = parse_preferences(body)
+    try:
+        n = max(1, min(int(body.get('n', 16)), MAX_RECOMMENDATIONS))
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text='"n" must be a number')
+    # Filtering the catalog is pandas work, keep it off the event loop
+    with timed('recommend'):
+        movies = await asyncio.to_thread(request.app['recommend'], distribution, preferences, n, get_dead_posters())
+    return web.json_response({'movies': [
+        {'title': str(title), 'genre': genre if isinstance(genre, str) else None,
+         'poster': poster if isinstance(poster, str) else None}
+        for title, genre, poster in zip(movies['Title'], movies['Genre'], movies['Poster'])
+    ]})
+
+
+async def handle_metrics(request):
+    if request.query.get('format') == 'json':
+        return web.json_response(get_metrics().snapshot())
+    return web.Response(text=get_metrics().render_prometheus(), content_type="text/plain")
+
+
+async def handle_stats(request):
+    return web.json_response(request.app['batcher'].stats())
+
+
+def make_app(catalog_path="cleanest_movie.csv", max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, mtcnn=True,
+             stream_catalog=False):
+    app = web.Application(client_max_size=MAX_UPLOAD_BYTES)
+    if stream_catalog:
+        app['recommend'] = StreamingCatalog(catalog_path).recommend
+    else:
+        with timed('catalog_load'):
+            movies = load_catalog(catalog_path)
+        index = GenreIndex(movies['Genre'])
+        app['recommend'] = lambda distribution, preferences, n, dead_posters: recommend(
+            movies, distribution, preferences, n, dead_posters, index)
+
+    async def start_model(app):
+        # Loaded once, before the first request, and shared by every connection
+        configure_threads(workers=1)  # The MicroBatcher calls the model from one thread
+        with timed('model_load'):
+            model = await asyncio.to_thread(EmotionModel, mtcnn=mtcnn)
+        app['batcher'] = MicroBatcher(model.predict, max_batch, max_wait_ms / 1000.0)
+        app['batcher'].start()
+
+    async def stop_model(app):
+        await app['batcher'].stop()
+
+    app.on_startup.append(start_model)
+    app.on_cleanup.append(stop_model)
+    app.router.add_post("/emotion", handle_emotion)
+    app.router.add_post("/recommend", handle_recommend)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve emotion detection and movie recommendations over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--catalog", default="cleanest_movie.csv", help="CSV file with Title, Genre and Poster")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="frames per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="how long a frame may wait for a fuller batch")
+    parser.add_argument("--cascade", action="store_true",
+                        help="find faces with OpenCV's Haar cascade instead of MTCNN (faster, less accurate)")
+    parser.add_argument("--stream-catalog", action="store_true",
+                        help="read the catalog from disk in chunks on every request instead of loading it")
+    args = parser.parse_args(argv)
+
+    web.run_app(make_app(args.catalog, args.max_batch, args.max_wait_ms, mtcnn=not args.cascade,
+                         stream_catalog=args.stream_catalog),
+                host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
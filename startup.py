@@ -0,0 +1,94 @@
+"""Fast start: the window opens first, the emotion model and the catalog load behind it.
+
+fer pulls in TensorFlow and MTCNN, which alone takes seconds, so no frontend imports
+it at module level any more. A Preloader imports and builds everything slow on a
+background thread and reports its progress for the UI to show.
+"""
+import os
+import sys
+import time
+import threading
+from metrics import timed
+
+CATALOG_PATH = "cleanest_movie.csv"
+STARTUP_PROBE = os.environ.get("EMOREC_STARTUP_PROBE")  # Set by benchmark.py --stages startup
+
+
+def load_emotion_model(mtcnn=True):
+    """Import fer and build the model, the slowest step of every startup."""
+    with timed('model_load'):
+        from inference import configure_threads
+        configure_threads()  # Before TensorFlow starts its thread pools
+        from emotion import EmotionModel
+        return EmotionModel(mtcnn=mtcnn)
+
+
+def load_movies(path=CATALOG_PATH):
+    with timed('catalog_load'):
+        from catalog import load_catalog
+        return load_catalog(path)
+
+
+class Preloader:
+    """Runs the slow startup steps in order on one background thread.
+
+    steps is a list of (label, func). on_progress(label, done, total) is called before
+    each step, and with label None once everything is loaded; on_error(label, error)
+    when a step fails, the steps after it still run. Both are called on the loader
+    thread, frontends hand them over to their UI thread.
+    """
+
+    def __init__(self, steps, on_progress=None, on_error=None):
+        self.steps = list(steps)
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.results = {}
+        self.errors = {}
+        self._done = {label: threading.Event() for label, _ in self.steps}
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="preload")
+            self._thread.start()
+        return self
+
+    def _run(self):
+        total = len(self.steps)
+        for done, (label, func) in enumerate(self.steps):
+            if self.on_progress:
+                self.on_progress(label, done, total)
+            try:
+                self.results[label] = func()
+            except Exception as e:
+                self.errors[label] = e
+                if self.on_error:
+                    self.on_error(label, e)
+            finally:
+                self._done[label].set()
+        if self.on_progress:
+            self.on_progress(None, total, total)
+
+    def ready(self, label):
+        return label in self.results
+
+    def get(self, label, timeout=None):
+        """Wait for a step and return its result, re-raising its error if it failed."""
+        if not self._done[label].wait(timeout):
+            raise TimeoutError(f"{label} is still loading")
+        if label in self.errors:
+            raise self.errors[label]
+        return self.results[label]
+
+
+def first_paint(quit=None):
+    """Call once the first frame is on screen.
+
+    When benchmark.py is timing startup this prints the moment for it and quits.
+    """
+    if STARTUP_PROBE:
+        print(f"FIRST_PAINT {time.time():.6f}", flush=True)
+        if quit is not None:
+            quit()
+        else:
+            sys.exit(0)
@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+import pytest
+
+# The app modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dead_posters import DeadPosterCache, get_dead_posters, set_dead_posters  # noqa: E402
+from poster_cache import PosterCache, get_poster_cache, set_poster_cache  # noqa: E402
+
+SLOW_SECONDS = 3  # How long the slow host sits on a request before answering
+
+
+class PosterHost(BaseHTTPRequestHandler):
+    """/ok.jpg answers at once, /slow.jpg only after SLOW_SECONDS, /busy.jpg is a 503, anything else a 404."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path.startswith("/slow"):
+            self.server.released.wait(SLOW_SECONDS)
+        if self.path.startswith(("/ok", "/slow")):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(self.server.poster)))
+            self.end_headers()
+            self.wfile.write(self.server.poster)
+        elif self.path.startswith("/busy"):
+            self.send_error(503)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def host():
+    """A local poster host, its url, the requests it got and the poster it serves are attributes."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PosterHost)
+    server.daemon_threads = True
+    server.released = threading.Event()
+    server.requests = []
+    server.poster = cv2.imencode(".jpg", np.zeros((60, 40, 3), np.uint8))[1].tobytes()
+    server.slow_seconds = SLOW_SECONDS
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.released.set()  # Lets the slow requests still waiting finish
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def caches(tmp_path):
+    """Empty poster and dead poster caches in tmp_path, as the process-wide ones."""
+    poster_cache, dead_posters = get_poster_cache(), get_dead_posters()
+    set_poster_cache(PosterCache(str(tmp_path / "posters")))
+    set_dead_posters(DeadPosterCache(str(tmp_path / "dead_posters.json")))
+    yield
+    set_poster_cache(poster_cache)
+    set_dead_posters(dead_posters)
@@ -0,0 +1,23 @@
+import tracemalloc
+import numpy as np
+from benchmark import synthetic_catalog
+from catalog import StreamingCatalog
+
+ROWS = 100_000
+CHUNK_ROWS = 5_000
+
+
+def test_streaming_catalog_holds_a_fraction_of_the_file(tmp_path):
+    path = str(tmp_path / "catalog.csv")
+    synthetic_catalog(ROWS).to_csv(path, index=False)
+    catalog = StreamingCatalog(path, chunk_rows=CHUNK_ROWS)
+    tracemalloc.start()
+    try:
+        movies = catalog.recommend({'happy': 1.0}, n=16, rng=np.random.default_rng(0))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    whole = synthetic_catalog(ROWS).memory_usage(deep=True).sum()
+    assert peak < whole / 4, f"peak {peak} bytes for a {whole} byte catalog"
+    assert len(movies) == 16
+    assert movies['Genre'].str.contains("Comedy|Romance|Animation").all()
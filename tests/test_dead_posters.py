@@ -0,0 +1,23 @@
+import json
+from dead_posters import DeadPosterCache
+
+
+def test_save_writes_only_what_changed_here(tmp_path):
+    path = str(tmp_path / "dead_posters.json")
+    first = DeadPosterCache(path)
+    first.record_failure("http://posters/a.jpg", "404")
+    first.save()
+    second = DeadPosterCache(path)  # Holds a copy of a.jpg from here on
+    first.record_success("http://posters/a.jpg")
+    first.save()
+    second.record_failure("http://posters/b.jpg", "timeout")
+    second.save()
+    with open(path, encoding="utf-8") as f:
+        assert sorted(json.load(f)) == ["http://posters/b.jpg"]
+    assert second.dead_urls() == {"http://posters/b.jpg"}  # Picked up the other process's success
+
+
+def test_nothing_to_save(tmp_path):
+    path = tmp_path / "dead_posters.json"
+    DeadPosterCache(str(path)).save()
+    assert not path.exists()
@@ -0,0 +1,42 @@
+from catalog import EMOTION_GENRES
+from history import DEFAULT_USER, EMOTION_ALIASES, HistoryStore
+
+
+def test_aliases_map_to_catalog_labels():
+    assert set(EMOTION_ALIASES.values()) <= set(EMOTION_GENRES)
+
+
+def test_emotions_are_stored_under_their_labels(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"))
+    history.save_preferences({'happiness': ['Comedy'], 'anger': ['Action']})
+    history.record_detection('sadness', {'sad': 0.8})
+    history.flush()
+    assert history.load_preferences() == {'happy': ['Comedy'], 'angry': ['Action']}
+    assert [emotion for _, emotion in history.recent_emotions()] == ['sad']
+    history.close()
+
+
+def test_users_are_kept_apart(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"))
+    history.save_preferences({'happy': ['Comedy']}, user="first")
+    history.record_impressions(['Up'], emotion='happy', user="first")
+    history.save_preferences({'happy': ['Drama']}, user="second")
+    history.flush()
+    assert history.load_preferences(user="first") == {'happy': ['Comedy']}
+    assert history.load_preferences(user="second") == {'happy': ['Drama']}
+    assert history.recent_titles(user="first") == {'Up'}
+    assert history.recent_titles(user="second") == set()
+    history.close()
+
+
+def test_preferences_survive_a_restart(tmp_path):
+    path = str(tmp_path / "history.db")
+    # The Streamlit form saves under the labels the model detects, for the user in the URL or EMOREC_USER
+    history = HistoryStore(path)
+    history.save_preferences({'angry': ['Action'], 'happy': ['Comedy', 'Animation']}, user=DEFAULT_USER)
+    history.record_impressions(['Up'], emotion='happy', user=DEFAULT_USER)
+    history.close()
+    restarted = HistoryStore(path)
+    assert restarted.load_preferences(user=DEFAULT_USER) == {'angry': ['Action'], 'happy': ['Comedy', 'Animation']}
+    assert restarted.recent_titles(user=DEFAULT_USER) == {'Up'}
+    restarted.close()
@@ -0,0 +1,44 @@
+import json
+import pytest
+from poster_cache import PosterCache
+
+
+@pytest.fixture
+def stale_cache(tmp_path):
+    """A cache holding month-old copies that have to be revalidated."""
+    cache = PosterCache(str(tmp_path / "posters"))
+
+    def put_stale(url):
+        cache.put(url, b"old poster")
+        meta_path = cache._paths(url)[1]
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["fetched_at"] = 0
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return cache.get(url)
+
+    cache.put_stale = put_stale
+    return cache
+
+
+def test_stale_copy_survives_a_server_error(host, stale_cache):
+    url = host.url + "/busy.jpg"
+    stale = stale_cache.put_stale(url)
+    failures = []
+    assert stale_cache.fetch(url, on_error=lambda *failure: failures.append(failure)) == stale
+    assert failures == []
+
+
+def test_stale_copy_of_a_gone_poster_is_dropped(host, stale_cache):
+    url = host.url + "/gone.jpg"
+    stale_cache.put_stale(url)
+    failures = []
+    assert stale_cache.fetch(url, on_error=lambda *failure: failures.append(failure)) is None
+    assert failures == [(url, '404')]
+
+
+def test_server_error_without_a_copy_is_reported(host, stale_cache):
+    failures = []
+    assert stale_cache.fetch(host.url + "/busy.jpg", on_error=lambda *failure: failures.append(failure)) is None
+    assert failures == [(host.url + "/busy.jpg", '503')]
@@ -0,0 +1,36 @@
+import time
+import pytest
+import posters
+from dead_posters import get_dead_posters
+
+pytestmark = pytest.mark.usefixtures("caches")
+
+
+def test_fetch_poster(host):
+    path = posters.fetch_poster(host.url + "/ok.jpg")
+    with open(path, "rb") as f:
+        assert f.read() == host.poster
+
+
+def test_slow_host_times_out_per_request(host):
+    started = time.monotonic()
+    assert posters.fetch_poster(host.url + "/slow.jpg", timeout=0.3) is None
+    assert time.monotonic() - started < host.slow_seconds / 2
+    assert get_dead_posters().dead_urls() == {host.url + "/slow.jpg"}
+
+
+def test_dead_poster_is_not_requested_again(host):
+    assert posters.fetch_poster(host.url + "/gone.jpg") is None
+    assert get_dead_posters().is_dead(host.url + "/gone.jpg")
+    assert posters.fetch_poster(host.url + "/gone.jpg") is None
+    assert host.requests == ["/gone.jpg"]
+
+
+def test_grid_deadline_bounds_the_whole_grid(host):
+    ok = host.url + "/ok.jpg"
+    urls = [ok, host.url + "/gone.jpg"] + [f"{host.url}/slow.jpg?{i}" for i in range(3)] + ["N/A"]
+    started = time.monotonic()
+    paths = posters.fetch_posters(urls, deadline=0.5, timeout=host.slow_seconds * 2)
+    assert time.monotonic() - started < host.slow_seconds / 2
+    assert paths[ok] is not None
+    assert {url: path for url, path in paths.items() if url != ok} == dict.fromkeys(urls[1:])
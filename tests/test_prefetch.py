@@ -0,0 +1,36 @@
+import os
+import time
+import pytest
+from poster_cache import get_poster_cache
+from prefetch import PosterPrefetcher
+from thumbnails import thumbnail_key
+
+pytestmark = pytest.mark.usefixtures("caches")
+SIZE = (40, 60)
+
+
+def wait_for_warm(prefetcher, deadline=5):
+    started = time.monotonic()
+    while prefetcher._in_flight and time.monotonic() - started < deadline:
+        time.sleep(0.01)
+
+
+def test_hits_count_only_posters_still_cached(host):
+    prefetcher = PosterPrefetcher()
+    urls = [f"{host.url}/ok.jpg?{i}" for i in range(3)]
+    prefetcher.prefetch(urls, size=SIZE)
+    wait_for_warm(prefetcher)
+    os.remove(get_poster_cache().get(thumbnail_key(urls[0], SIZE)))  # Evicted since it was warmed
+    prefetcher.record_use(urls + [host.url + "/ok.jpg?other"], size=SIZE)
+    assert (prefetcher.hits, prefetcher.misses) == (2, 2)
+    prefetcher.prefetch(urls, size=SIZE)  # The evicted one is warmed again
+    wait_for_warm(prefetcher)
+    prefetcher.record_use(urls, size=SIZE)
+    assert prefetcher.hits == 5
+
+
+def test_warmed_posters_are_bounded(host):
+    prefetcher = PosterPrefetcher(max_warmed=2)
+    prefetcher.prefetch([f"{host.url}/ok.jpg?{i}" for i in range(5)])
+    wait_for_warm(prefetcher)
+    assert len(prefetcher._warmed) == 2
@@ -0,0 +1,36 @@
+import os
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt6.QtCore")
+from PyQt6.QtGui import QPixmap  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+import prefetch  # noqa: E402
+from prefetch import PosterPrefetcher  # noqa: E402
+from qt_grid import MovieListModel  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+
+class StubLoader(QtCore.QObject):
+    """Stands in for PosterLoader, every poster is still downloading."""
+    poster_loaded = QtCore.pyqtSignal(str, QPixmap)
+    size = (40, 60)
+
+    def reset(self):
+        pass
+
+    def load(self, url):
+        return None
+
+
+def test_painted_posters_are_counted_once(monkeypatch):
+    prefetcher = PosterPrefetcher()
+    monkeypatch.setattr(prefetch, "_default_prefetcher", prefetcher)
+    model = MovieListModel(StubLoader())
+    model.set_movies(["Up", "Heat"], ["http://127.0.0.1:1/up.jpg", "N/A"])
+    for _ in range(3):  # Repaints of the same tiles
+        for row in range(2):
+            model.data(model.index(row), QtCore.Qt.ItemDataRole.DecorationRole)
+    assert prefetcher.stats()['misses'] == 1  # The tile without a poster URL is not counted
+    prefetcher.cancel(owner=id(model))
@@ -0,0 +1,55 @@
+import asyncio
+import pandas as pd
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+import service
+from catalog import GenreIndex, recommend, sample_movies
+
+MOVIES = pd.DataFrame({
+    'Title': ['Up', 'Heat', 'Alien'],
+    'Genre': ['Comedy', 'Crime', 'Horror'],
+    'Poster': ['http://posters/up.jpg', 'http://posters/heat.jpg', 'http://posters/alien.jpg'],
+})
+
+
+def test_recommend_without_matches_is_empty():
+    for index in (None, GenreIndex(MOVIES['Genre'])):
+        movies = recommend(MOVIES, {'happy': 1.0}, {'happy': ['Western']}, index=index)
+        assert len(movies) == 0
+        assert list(movies.columns) == list(MOVIES.columns)
+
+
+def test_sample_movies_of_nothing():
+    assert len(sample_movies(MOVIES, 0, weights=[1.0, 1.0, 1.0])) == 0
+    assert len(sample_movies(MOVIES.head(0), 16, weights=[])) == 0
+
+
+def post_recommend(body):
+    async def run():
+        app = web.Application()
+        app['recommend'] = lambda distribution, preferences, n, dead_posters: recommend(
+            MOVIES, distribution, preferences, n, dead_posters)
+        app.router.add_post("/recommend", service.handle_recommend)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/recommend", json=body)
+            return response.status, await response.text()
+    return asyncio.run(run())
+
+
+def test_recommend_endpoint_without_matches():
+    status, text = post_recommend({'emotion': 'happy', 'preferences': {'happy': ['Western']}})
+    assert status == 200
+    assert text == '{"movies": []}'
+
+
+@pytest.mark.parametrize('body', [
+    {'emotion': 'happy', 'preferences': {'happy': 'Comedy'}},
+    {'emotion': 'happy', 'preferences': {'happy': [1, 2]}},
+    {'emotion': 'happy', 'preferences': ['Comedy']},
+    {'emotions': {'happy': 'NaN'}},
+    {'emotions': {'happy': 'inf'}},
+])
+def test_recommend_endpoint_rejects_bad_input(body):
+    status, _ = post_recommend(body)
+    assert status == 400
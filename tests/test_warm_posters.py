@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+import warm_posters
+
+pytestmark = pytest.mark.usefixtures("caches")
+
+
+@pytest.fixture
+def catalog(tmp_path, host):
+    path = tmp_path / "catalog.csv"
+    urls = [host.url + "/ok.jpg", host.url + "/gone.jpg", host.url + "/slow.jpg"]
+    path.write_text("Poster\n" + "\n".join(urls) + "\n")
+    return str(path), urls
+
+
+def test_checkpoint_keeps_only_cached_and_gone_posters(tmp_path, catalog, monkeypatch):
+    path, (ok, gone, slow) = catalog
+    monkeypatch.setattr(warm_posters, "warm_one", lambda url, sizes: warm_posters.fetch_poster(url, timeout=0.3))
+    checkpoint = str(tmp_path / "warm.checkpoint")
+    stats = asyncio.run(warm_posters.warm_catalog(path, [], concurrency=2, host_rate=0, checkpoint_path=checkpoint))
+    assert (stats['ok'], stats['dead'], stats['failed'], stats['errors']) == (1, 1, 1, 0)
+    assert warm_posters.load_checkpoint(checkpoint) == {ok, gone}  # The slow one is tried again next run
+
+
+def test_failing_posters_do_not_stall_the_run(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text("Poster\n" + "\n".join(f"http://127.0.0.1:1/{i}.jpg" for i in range(50)) + "\n")
+
+    def broken(url, sizes):
+        raise ValueError("not an image")
+
+    monkeypatch.setattr(warm_posters, "warm_one", broken)
+    stats = asyncio.run(asyncio.wait_for(
+        warm_posters.warm_catalog(str(path), [], concurrency=2, host_rate=0), 5))
+    assert stats['errors'] == 50
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+# Display sizes (width, height) of a poster tile in each frontend
+THUMB_SIZES = {
+    'qt': (150, 200),
+    'web': (300, 450),  # Streamlit 4-column grid
+    'phone': (240, 360),  # Kivy tile, dp(300) * 0.8 high on a typical phone
+}
+THUMB_EXT = ".jpg"  # JPEG loads everywhere (Kivy's SDL2 loader may lack WebP)
+THUMB_QUALITY = 85
+
+
+def thumbnail_key(url, size):
+    """Pseudo URL under which the thumbnail of a poster is cached."""
+    return f"{url}#thumb={size[0]}x{size[1]}"
+
+
+def make_thumbnail(data, size, quality=THUMB_QUALITY):
+    """Decode poster bytes once, shrink them to fit size and re-encode as a compact JPEG.
+
+    Returns None when the bytes are not a decodable image.
+    """
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    scale = min(size[0] / width, size[1] / height)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(THUMB_EXT, image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes() if ok else None
+
+
+def cached_thumbnail(cache, url, size, data=None, source_path=None):
+    """Return the path of the thumbnail in the poster cache, building it from data or source_path if needed."""
+    key = thumbnail_key(url, size)
+    path = cache.get(key)
+    if path is not None:
+        return path
+    if data is None:
+        if source_path is None:
+            return None
+        try:
+            with open(source_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None  # Evicted by another process meanwhile
+    thumb = make_thumbnail(data, size)
+    if thumb is None:
+        return None
+    return cache.put(key, thumb, content_type="image/jpeg")
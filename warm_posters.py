@@ -0,0 +1,167 @@
+"""Warm the poster cache for every movie in the catalog before a deployment.
+
+    python warm_posters.py --catalog cleanest_movie.csv --concurrency 8 --host-rate 5
+
+Progress is checkpointed to a file of finished URLs, so an interrupted run picks up
+where it stopped when started again with the same --checkpoint. Only cached posters and
+ones the host says are gone (404, 410) count as finished, timeouts and errors are tried
+again by the next run.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import pandas as pd
+from posters import fetch_poster, is_poster_url, MAX_WORKERS
+from poster_cache import PosterCache, set_poster_cache
+from dead_posters import DeadPosterCache, get_dead_posters, set_dead_posters
+from thumbnails import THUMB_SIZES
+
+CHUNK_ROWS = 50000  # Catalog rows read at a time
+PROGRESS_INTERVAL = 10  # Seconds between progress lines
+CHECKPOINT_INTERVAL = 200  # Finished URLs between checkpoint flushes
+PERMANENT_FAILURES = {'404', '410'}  # Failure kinds not worth retrying on the next run
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host to at most rate per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def iter_poster_urls(catalog_path):
+    """Yield the distinct poster URLs of the catalog without loading it whole."""
+    seen = set()
+    for chunk in pd.read_csv(catalog_path, usecols=['Poster'], chunksize=CHUNK_ROWS):
+        for url in chunk['Poster']:
+            if is_poster_url(url) and url not in seen:
+                seen.add(url)
+                yield url
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def warm_one(url, sizes):
+    """Fetch the poster and its thumbnails into the cache, True when it is available."""
+    if not sizes:
+        return fetch_poster(url) is not None
+    return all([fetch_poster(url, size) is not None for size in sizes])
+
+
+async def warm_catalog(catalog_path, sizes, concurrency=MAX_WORKERS, host_rate=5.0, checkpoint_path=None):
+    # Blocking fetches run on their own pool, so concurrency is not capped by the default executor
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    done = load_checkpoint(checkpoint_path)
+    stats = {'ok': 0, 'dead': 0, 'failed': 0, 'errors': 0, 'resumed': len(done)}
+    limiter = HostRateLimiter(host_rate)
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    started = time.monotonic()
+    last_report = started
+    finished_since_flush = 0
+
+    def report(final=False):
+        elapsed = time.monotonic() - started
+        processed = stats['ok'] + stats['dead'] + stats['failed'] + stats['errors']
+        rate = processed / elapsed if elapsed else 0.0
+        print(f"{'Finished' if final else 'Progress'}: {processed} posters in {elapsed:.1f}s "
+              f"({rate:.1f}/s), {stats['ok']} cached, {stats['dead']} dead, {stats['failed']} unreachable, "
+              f"{stats['errors']} errors, {stats['resumed']} skipped from checkpoint", file=sys.stderr)
+
+    async def worker():
+        nonlocal last_report, finished_since_flush
+        while True:
+            url = await queue.get()
+            try:
+                await limiter.wait(urlparse(url).netloc)
+                ok = await asyncio.to_thread(warm_one, url, sizes)
+                if ok:
+                    stats['ok'] += 1
+                elif get_dead_posters().failure(url) in PERMANENT_FAILURES:
+                    stats['dead'] += 1
+                else:
+                    stats['failed'] += 1
+                    continue  # Unreachable for now, the next run tries it again
+                if checkpoint:
+                    checkpoint.write(url + "\n")
+                    finished_since_flush += 1
+                    if finished_since_flush >= CHECKPOINT_INTERVAL:
+                        # Dead URLs are persisted before the checkpoint claims they were handled
+                        await asyncio.to_thread(get_dead_posters().save)
+                        checkpoint.flush()
+                        finished_since_flush = 0
+            except Exception as e:
+                # Counted and skipped, a worker that died would leave the producer blocked on a full queue
+                stats['errors'] += 1
+                print(f"Could not warm {url}: {e!r}", file=sys.stderr)
+            finally:
+                queue.task_done()
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    report()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for url in iter_poster_urls(catalog_path):
+            if url not in done:
+                await queue.put(url)
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        get_dead_posters().save()
+        if checkpoint:
+            checkpoint.close()
+    report(final=True)
+    stats['seconds'] = time.monotonic() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download and cache every poster in the movie catalog.")
+    parser.add_argument("--catalog", default="cleanest_movie.csv", help="CSV file with a Poster column")
+    parser.add_argument("--concurrency", type=int, default=MAX_WORKERS, help="posters fetched at once")
+    parser.add_argument("--host-rate", type=float, default=5.0,
+                        help="max requests per second to a single host (0 for unlimited)")
+    parser.add_argument("--sizes", default=",".join(THUMB_SIZES),
+                        help="thumbnail sizes to build, comma separated names from THUMB_SIZES (empty for none)")
+    parser.add_argument("--checkpoint", default="warm_posters.checkpoint",
+                        help="file of finished URLs used to resume an interrupted run")
+    parser.add_argument("--cache-dir", help="poster cache directory (defaults to the shared cache)")
+    parser.add_argument("--dead-list", help="dead poster list file (defaults to the shared one)")
+    args = parser.parse_args(argv)
+
+    if args.cache_dir:
+        set_poster_cache(PosterCache(args.cache_dir))
+    if args.dead_list:
+        set_dead_posters(DeadPosterCache(args.dead_list))
+    sizes = [THUMB_SIZES[name] for name in args.sizes.split(",") if name]
+    try:
+        asyncio.run(warm_catalog(args.catalog, sizes, args.concurrency, args.host_rate, args.checkpoint))
+    except KeyboardInterrupt:
+        print("Interrupted, run again with the same --checkpoint to resume.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())